@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+from langgraph.errors import GraphRecursionError
+
+from streamlit_wrapper import graph_config, initial_state
+
+
+RATE_LIMIT_STATUS = (429, 529)
+
+
+def load_jobs(path):
+    """JSONL ({"question": ..., "id": 선택}) 을 읽어 (id, question) 목록 반환. id 가 없으면 줄 번호 사용"""
+    jobs = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            jobs.append((str(record.get("id", f"line-{line_number}")), record["question"]))
+    return jobs
+
+
+def completed_ids(path):
+    """이미 결과 파일에 성공적으로 기록된 id (중단 후 다시 실행할 때 건너뜀)"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 중단되며 잘린 마지막 줄
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def is_rate_limited(error):
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in RATE_LIMIT_STATUS:
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "overloaded" in message
+
+
+def retry_delay(error, attempt, base=1.0, cap=60.0):
+    # 서버가 retry-after 를 알려주면 따르고, 아니면 full jitter 지수 백오프
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(cap, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def _missing_newline(path):
+    if os.path.getsize(path) == 0:
+        return False
+    with open(path, "rb") as file:
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) != b"\n"
+
+
+class ResultWriter:
+    """
+    결과를 끝나는 순서대로 JSONL 에 한 줄씩 추가 (중단되어도 기록된 결과는 유지)
+    resume=False 이면 기존 결과를 지우고 새로 기록
+    """
+
+    def __init__(self, path, resume=True):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and _missing_newline(path):
+            # 중단되며 잘린 마지막 줄 뒤에 이어 쓰면 첫 결과도 깨지므로 줄을 바꾼 뒤 추가
+            self._file.write("\n")
+            self._file.flush()
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.counts[record["status"]] = self.counts.get(record["status"], 0) + 1
+
+    def close(self):
+        self._file.close()
+
+
+def _result(job_id, question, status, values, nodes, started, attempts, error=None):
+    values = values or {}
+    record = {
+        "id": job_id,
+        "question": question,
+        "status": status,
+        "generation": values.get("generation", ""),
+        "route": [node for node, _ in nodes],
+        "documents": values.get("context") or values.get("documents") or [],
+        "node_seconds": nodes,
+        "seconds": time.perf_counter() - started,
+        "attempts": attempts,
+        "llm_calls": values.get("llm_calls", 0),
+        # 예산이 소진되어 검증을 마치지 못한 답변이면 그 이유
+        "budget_exhausted": values.get("budget_exhausted", ""),
+    }
+    if error is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+    return record
+
+
+def run_job(app, job_id, question, max_retries=5, backoff=1.0):
+    """질문 하나를 실행. rate limit 오류는 백오프 후 처음부터 다시 실행"""
+    started = time.perf_counter()
+    for attempt in range(max_retries + 1):
+        thread_id = f"batch-{job_id}-{attempt}"
+        config = graph_config(thread_id)
+        nodes = []
+        last = time.perf_counter()
+        try:
+            try:
+                for output in app.stream(initial_state(question), config=config, stream_mode="updates"):
+                    now = time.perf_counter()
+                    for key in output:
+                        nodes.append((key, now - last))
+                    last = now
+                status = "ok"
+            except GraphRecursionError:
+                status = "recursion_limit"
+            values = app.get_state(config).values
+            return _result(job_id, question, status, values, nodes, started, attempt + 1)
+        except Exception as e:
+            if is_rate_limited(e) and attempt < max_retries:
+                time.sleep(retry_delay(e, attempt, backoff))
+                continue
+            return _result(job_id, question, "error", None, nodes, started, attempt + 1, error=e)
+        finally:
+            # 배치 실행에서는 대화를 이어가지 않으므로 체크포인트를 바로 삭제
+            app.checkpointer.delete_thread(thread_id)
+
+
+async def arun_job(app, job_id, question, max_retries=5, backoff=1.0):
+    """run_job 의 비동기 버전 (create_graph(async_mode=True) 그래프 필요)"""
+    started = time.perf_counter()
+    for attempt in range(max_retries + 1):
+        thread_id = f"batch-{job_id}-{attempt}"
+        config = graph_config(thread_id)
+        nodes = []
+        last = time.perf_counter()
+        try:
+            try:
+                async for output in app.astream(initial_state(question), config=config, stream_mode="updates"):
+                    now = time.perf_counter()
+                    for key in output:
+                        nodes.append((key, now - last))
+                    last = now
+                status = "ok"
+            except GraphRecursionError:
+                status = "recursion_limit"
+            values = (await app.aget_state(config)).values
+            return _result(job_id, question, status, values, nodes, started, attempt + 1)
+        except Exception as e:
+            if is_rate_limited(e) and attempt < max_retries:
+                await asyncio.sleep(retry_delay(e, attempt, backoff))
+                continue
+            return _result(job_id, question, "error", None, nodes, started, attempt + 1, error=e)
+        finally:
+            await app.checkpointer.adelete_thread(thread_id)
+
+
+def _progress(writer, total, started):
+    done = sum(writer.counts.values())
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed * 3600 if elapsed > 0 else 0.0
+    print(f"[{done}/{total}] {writer.counts} {rate:.0f} questions/hour", file=sys.stderr)
+
+
+def run_threaded(app, jobs, writer, workers, max_retries, backoff, progress_every=50):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_job, app, job_id, question, max_retries, backoff)
+            for job_id, question in jobs
+        ]
+        for i, future in enumerate(as_completed(futures), 1):
+            writer.write(future.result())
+            if i % progress_every == 0:
+                _progress(writer, len(jobs), started)
+
+
+async def run_async(app, jobs, writer, workers, max_retries, backoff, progress_every=50):
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(workers)
+
+    async def worker(job_id, question):
+        async with semaphore:
+            return await arun_job(app, job_id, question, max_retries, backoff)
+
+    tasks = [asyncio.create_task(worker(job_id, question)) for job_id, question in jobs]
+    for i, next_done in enumerate(asyncio.as_completed(tasks), 1):
+        writer.write(await next_done)
+        if i % progress_every == 0:
+            _progress(writer, len(jobs), started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONL 질문 목록을 일괄 처리 (Streamlit 없이 실행)")
+    parser.add_argument("input", help='JSONL 파일 ({"question": ..., "id": ...} 한 줄씩)')
+    parser.add_argument("output", help="결과 JSONL 파일 (이미 있으면 성공한 id 는 건너뛰고 이어서 기록)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--mode", choices=["thread", "async"], default="async")
+    parser.add_argument("--max-retries", type=int, default=5, help="rate limit 오류 재시도 횟수")
+    parser.add_argument("--backoff", type=float, default=1.0, help="백오프 기본 대기 시간(초)")
+    parser.add_argument("--no-resume", action="store_true", help="결과 파일의 기존 결과를 지우고 모두 다시 실행")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # 리트리버/그래프는 resources 에서 한 번만 생성해 모든 작업자가 공유
+    from resources import get_graph
+
+    jobs = load_jobs(args.input)
+    if not args.no_resume:
+        done = completed_ids(args.output)
+        jobs = [(job_id, question) for job_id, question in jobs if job_id not in done]
+    print(f"{len(jobs)} questions to run", file=sys.stderr)
+
+    app = get_graph()
+    writer = ResultWriter(args.output, resume=not args.no_resume)
+    started = time.perf_counter()
+    try:
+        if args.mode == "async":
+            asyncio.run(run_async(app, jobs, writer, args.workers, args.max_retries, args.backoff))
+        else:
+            run_threaded(app, jobs, writer, args.workers, args.max_retries, args.backoff)
+    finally:
+        writer.close()
+        _progress(writer, len(jobs), started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import resource
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langgraph.errors import GraphRecursionError
+
+from chains import set_llm_factory
+import tracing
+from tools import WEB_SEARCH_CACHE_ENABLED, configure_web_search_cache, set_web_search_factory
+
+
+DEFAULT_QUESTIONS = [
+    "How do I add a conditional edge to a StateGraph?",
+    "What does MemorySaver do in langgraph?",
+    "How can I stream tokens from a node?",
+    "What is the difference between invoke and stream in a compiled graph?",
+    "How do I set a recursion limit for a graph run?",
+    "How do I use interrupt_before for human-in-the-loop?",
+    "What is a checkpointer thread_id used for?",
+    "How do I define a reducer for a state key with Annotated?",
+    "What is the weather in Seoul today?",
+    "Who won the last world cup?",
+]
+
+
+@dataclass
+class FakeBackendConfig:
+    """가짜 LLM / 웹 검색의 지연 시간과 응답 분포"""
+
+    llm_latency: float = 0.8  # LLM 호출 평균 지연 (초)
+    llm_jitter: float = 0.2
+    search_latency: float = 1.0  # 웹 검색 평균 지연 (초)
+    search_jitter: float = 0.3
+    router_yes_rate: float = 0.8  # 질문이 vectorstore 로 라우팅될 비율
+    doc_relevant_rate: float = 0.6  # 문서 평가에서 "yes" 비율
+    not_grounded_rate: float = 0.1  # groundedness 검사에서 "no" 비율
+    answer_relevant_rate: float = 0.9  # 답변 관련성 검사에서 "yes" 비율
+    answer_tokens: int = 200
+    seed: int = 0
+
+
+# 구조화 출력 스키마별 "yes" 확률
+def _yes_rate(config, schema_name):
+    return {
+        "RouteQuery": config.router_yes_rate,
+        "GradeDocuments": config.doc_relevant_rate,
+        "AnswerGroundedness": 1 - config.not_grounded_rate,
+        "GradeAnswer": config.answer_relevant_rate,
+    }.get(schema_name, 0.5)
+
+
+def _prompt_text(value):
+    if hasattr(value, "to_string"):
+        return value.to_string()
+    if isinstance(value, list):
+        return "\n".join(str(getattr(m, "content", m)) for m in value)
+    return str(value)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    ChatAnthropic 대신 사용하는 결정적(deterministic) 가짜 chat model
+
+    같은 (seed, 체인, 프롬프트) 에는 항상 같은 응답과 지연 시간을 돌려줍니다.
+    """
+
+    config: Any
+    chain_name: str = "fake"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _rng(self, prompt):
+        return random.Random(f"{self.config.seed}:{self.chain_name}:{prompt}")
+
+    def _latency(self, rng):
+        return max(0.0, rng.gauss(self.config.llm_latency, self.config.llm_jitter))
+
+    def _answer(self, rng):
+        words = ["langgraph", "StateGraph", "node", "edge", "checkpoint", "stream", "state"]
+        return " ".join(rng.choice(words) for _ in range(self.config.answer_tokens))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        rng = self._rng(_prompt_text(messages))
+        time.sleep(self._latency(rng))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(rng)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        rng = self._rng(_prompt_text(messages))
+        await asyncio.sleep(self._latency(rng))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(rng)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # 첫 토큰까지 지연의 절반, 나머지를 토큰마다 나누어 대기
+        rng = self._rng(_prompt_text(messages))
+        latency = self._latency(rng)
+        tokens = self._answer(rng).split(" ")
+        time.sleep(latency / 2)
+        for token in tokens:
+            time.sleep(latency / 2 / len(tokens))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def with_structured_output(self, schema, **kwargs):
+        def verdict(prompt):
+            rng = self._rng(_prompt_text(prompt))
+            latency = self._latency(rng)
+            score = "yes" if rng.random() < _yes_rate(self.config, schema.__name__) else "no"
+            return latency, schema(binary_score=score)
+
+        def invoke(prompt):
+            latency, result = verdict(prompt)
+            time.sleep(latency)
+            return result
+
+        async def ainvoke(prompt):
+            latency, result = verdict(prompt)
+            await asyncio.sleep(latency)
+            return result
+
+        return RunnableLambda(invoke, afunc=ainvoke, name=f"Fake{schema.__name__}")
+
+
+class FakeWebSearch:
+    """TavilySearch 대신 사용하는 가짜 웹 검색 도구"""
+
+    def __init__(self, config, max_results=6):
+        self.config = config
+        self.max_results = max_results
+
+    def _search(self, query):
+        rng = random.Random(f"{self.config.seed}:search:{query}")
+        latency = max(0.0, rng.gauss(self.config.search_latency, self.config.search_jitter))
+        results = [
+            {"url": f"https://example.com/{i}", "content": f"Result {i} for {query}"}
+            for i in range(self.max_results)
+        ]
+        return latency, results
+
+    def invoke(self, input, config=None):
+        latency, results = self._search(input["query"])
+        time.sleep(latency)
+        return results
+
+    async def ainvoke(self, input, config=None):
+        latency, results = self._search(input["query"])
+        await asyncio.sleep(latency)
+        return results
+
+
+def install_fake_backends(config):
+    """이후 생성되는 체인과 웹 검색 도구가 가짜 백엔드를 사용하도록 설정"""
+    set_llm_factory(lambda chain_name, model_name: FakeChatModel(config=config, chain_name=chain_name))
+    set_web_search_factory(lambda: FakeWebSearch(config))
+    # 반복 실행 간에 검색 결과가 재사용되지 않도록 웹 검색 캐시는 끔 (LLM 도 캐시 없이 호출됨)
+    configure_web_search_cache(enabled=False)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    # nearest-rank 방식
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, math.ceil(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+def latency_summary(values):
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def run_question(app, question):
+    """질문 하나를 실행하고 (종단 지연, 노드별 지연, 결과) 를 반환"""
+    from streamlit_wrapper import graph_config, initial_state
+
+    config = graph_config(str(uuid.uuid4()))
+    node_times = []
+    outcome = "ok"
+    started = last = time.perf_counter()
+    try:
+        for output in app.stream(initial_state(question), config=config, stream_mode="updates"):
+            now = time.perf_counter()
+            # 조건부 엣지(라우터, 답변 검증)의 시간은 해당 노드 시간에 포함됨
+            for key in output:
+                node_times.append((key, now - last))
+                if key == "budget_exhausted":
+                    outcome = "budget_exhausted"
+            last = now
+    except GraphRecursionError:
+        outcome = "recursion_limit"
+    except Exception as e:
+        outcome = type(e).__name__
+    return time.perf_counter() - started, node_times, outcome
+
+
+def run_pass(app, questions, concurrency):
+    end_to_end = []
+    per_node = {}
+    outcomes = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for elapsed, node_times, outcome in executor.map(lambda q: run_question(app, q), questions):
+            end_to_end.append(elapsed)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            for node, seconds in node_times:
+                per_node.setdefault(node, []).append(seconds)
+    wall = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "questions": len(questions),
+        "wall_seconds": wall,
+        "throughput_qps": len(questions) / wall if wall > 0 else None,
+        "end_to_end": latency_summary(end_to_end),
+        "nodes": {node: latency_summary(times) for node, times in sorted(per_node.items())},
+        "outcomes": outcomes,
+    }
+
+
+def load_questions(path):
+    if path is None:
+        return list(DEFAULT_QUESTIONS)
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line)["question"] for line in file if line.strip()]
+
+
+def install_tracing(mode, collector):
+    """
+    벤치마크용 추적 설정. 오프라인이므로 LangSmith 대신 LocalCollector 로 전송하며
+    "full" 은 모든 trace 를 payload 축소 없이, "sampled" 는 TRACING_SAMPLE_RATE 로 샘플링해 전송
+    """
+    if mode == "off":
+        return tracing.configure_tracing("off")
+    return tracing.configure_tracing(
+        "sampled",
+        "benchmark",
+        client=collector,
+        sample_rate=1.0 if mode == "full" else tracing.TRACING_SAMPLE_RATE,
+        truncate=mode != "full",
+    )
+
+
+def run_benchmark(questions, config, concurrency=(1, 8), repeat=1, graph_kwargs=None, tracing_mode="off"):
+    from streamlit_wrapper import create_graph
+
+    install_fake_backends(config)
+    collector = tracing.LocalCollector()
+    tracer = install_tracing(tracing_mode, collector)
+    try:
+        app = create_graph(**(graph_kwargs or {}))
+        questions = questions * repeat
+        results = {
+            "config": asdict(config),
+            "graph": graph_kwargs or {},
+            "tracing": tracing_mode,
+            "passes": [run_pass(app, questions, n) for n in concurrency],
+        }
+        if tracer is not None:
+            # 요청 경로 밖에서 진행되는 export 가 끝나는 데 걸린 시간
+            started = time.perf_counter()
+            tracer.exporter.drain()
+            results["trace_export"] = {
+                "drain_seconds": time.perf_counter() - started,
+                "runs": len(collector.runs),
+                "batches": collector.batches,
+                "bytes": sum(len(json.dumps(run, default=str)) for run in collector.runs),
+            }
+    finally:
+        tracing.configure_tracing("off")
+        set_llm_factory(None)
+        set_web_search_factory(None)
+        configure_web_search_cache(enabled=WEB_SEARCH_CACHE_ENABLED)
+    # Linux 에서 ru_maxrss 단위는 KB
+    results["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가짜 LLM/웹 검색으로 그래프 성능 측정 (오프라인)")
+    parser.add_argument("--questions", default=None, help='JSONL 파일 ({"question": ...} 한 줄씩)')
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--search-latency", type=float, default=1.0)
+    parser.add_argument("--not-grounded-rate", type=float, default=0.1)
+    parser.add_argument("--doc-relevant-rate", type=float, default=0.6)
+    parser.add_argument("--router-yes-rate", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument(
+        "--tracing",
+        nargs="+",
+        choices=["off", "sampled", "full"],
+        default=["off"],
+        help="여러 개를 주면 추적 방식별로 실행해 오버헤드를 비교",
+    )
+    parser.add_argument("--output", default=None, help="결과 JSON 파일 (없으면 표준 출력)")
+    args = parser.parse_args()
+
+    config = FakeBackendConfig(
+        llm_latency=args.llm_latency,
+        search_latency=args.search_latency,
+        not_grounded_rate=args.not_grounded_rate,
+        doc_relevant_rate=args.doc_relevant_rate,
+        router_yes_rate=args.router_yes_rate,
+        seed=args.seed,
+    )
+    runs = {
+        mode: run_benchmark(
+            load_questions(args.questions),
+            config,
+            concurrency=args.concurrency,
+            repeat=args.repeat,
+            graph_kwargs={"speculative": args.speculative},
+            tracing_mode=mode,
+        )
+        for mode in args.tracing
+    }
+    results = runs[args.tracing[0]] if len(runs) == 1 else runs
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
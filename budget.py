@@ -0,0 +1,85 @@
+import os
+import time
+
+
+# 요청 하나에 허용하는 시간(초)과 LLM 호출 수 (환경 변수로 변경 가능)
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", 60))
+REQUEST_LLM_BUDGET = int(os.environ.get("REQUEST_LLM_BUDGET", 20))
+# 남은 시간을 추정할 때 사용하는 LLM 호출 한 번의 예상 소요 시간(초)
+SECONDS_PER_LLM_CALL = float(os.environ.get("SECONDS_PER_LLM_CALL", 3.0))
+
+# START 의 질문 라우팅 (조건부 엣지라 상태를 갱신할 수 없으므로 initial_state 에서 미리 계산)
+ROUTER_LLM_CALLS = 1
+# 답변 생성(1) + 답변 검증(groundedness, 관련성 2)
+ANSWER_LLM_CALLS = 3
+CHECK_LLM_CALLS = 2
+# 답변 검증 실패 후 다시 답변하는 데 필요한 호출 수 (not grounded 는 질문 재작성 1회 추가)
+RETRY_LLM_CALLS = {
+    "not grounded": 1 + ANSWER_LLM_CALLS,
+    "not relevant": ANSWER_LLM_CALLS,
+}
+
+EXHAUSTED_MESSAGES = {
+    "deadline": "⏱️ 응답 시간 제한에 도달해 검증을 마치지 못한 답변입니다.",
+    "llm_budget": "⚠️ 요청당 LLM 호출 한도에 도달해 검증을 마치지 못한 답변입니다.",
+}
+
+
+def new_budget(deadline_seconds=None, llm_budget=None):
+    """initial_state 에 넣을 예산 필드. deadline 은 체크포인트에 저장되므로 epoch 초로 기록"""
+    if deadline_seconds is None:
+        deadline_seconds = REQUEST_DEADLINE_SECONDS
+    return {
+        "deadline": time.time() + deadline_seconds,
+        "llm_budget": REQUEST_LLM_BUDGET if llm_budget is None else llm_budget,
+        "llm_calls": ROUTER_LLM_CALLS,
+        "budget_exhausted": "",
+    }
+
+
+def recursion_limit(llm_budget=None):
+    """
+    llm_budget 으로 가능한 가장 긴 실행보다 큰 recursion_limit.
+    가장 짧은 반복(web_search -> rag_answer)도 2 단계마다 LLM 호출 3 회를 쓰므로
+    반복은 항상 예산 소진(budget_exhausted)으로 먼저 끝남
+    """
+    if llm_budget is None:
+        llm_budget = REQUEST_LLM_BUDGET
+    return 2 * llm_budget + 8
+
+
+def remaining_seconds(state):
+    deadline = state.get("deadline")
+    if deadline is None:
+        return float("inf")
+    return deadline - time.time()
+
+
+def remaining_llm_calls(state):
+    llm_budget = state.get("llm_budget")
+    if llm_budget is None:
+        return float("inf")
+    return llm_budget - state.get("llm_calls", 0)
+
+
+def charge(state, llm_calls):
+    """노드가 반환할 llm_calls 값 (지금까지의 호출 수 + 이번 노드의 호출 수)"""
+    return state.get("llm_calls", 0) + llm_calls
+
+
+def shortfall(state, llm_calls, seconds=None):
+    """
+    llm_calls 번의 LLM 호출을 더 할 수 없으면 그 이유("deadline" / "llm_budget"), 가능하면 None
+    seconds 가 없으면 호출을 순차로 실행한다고 보고 SECONDS_PER_LLM_CALL 로 추정
+    """
+    if seconds is None:
+        seconds = llm_calls * SECONDS_PER_LLM_CALL
+    if remaining_seconds(state) < seconds:
+        return "deadline"
+    if remaining_llm_calls(state) < llm_calls:
+        return "llm_budget"
+    return None
+
+
+def exhausted_message(reason):
+    return EXHAUSTED_MESSAGES.get(reason, "")
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import random
+import threading
+
+
+# LLM 문서 평가 결과와 reranker 점수를 기록할 파일 (빈 문자열로 설정하면 기록하지 않음)
+GRADER_LOG_FILE = os.environ.get("GRADER_LOG_FILE", "grader_grades.jsonl")
+# score_filter 가 점수만으로 판정한 문서 중 LLM 으로도 평가해 기록할 비율
+# (경계 구간 문서만 기록하면 임계값 바깥의 정밀도를 다시 확인할 수 없음)
+GRADER_AUDIT_RATE = float(os.environ.get("GRADER_AUDIT_RATE", "0.05"))
+GRADER_CALIBRATION_FILE = os.environ.get("GRADER_CALIBRATION_FILE", "grader_calibration.json")
+
+# 보정 파일이 없을 때 사용하는 보수적인 기본값 (Flashrank 점수는 0~1)
+DEFAULT_LOW = 0.02
+DEFAULT_HIGH = 0.95
+
+_log_lock = threading.Lock()
+
+
+def log_grade(score, grade, path=GRADER_LOG_FILE):
+    """reranker 점수와 LLM 평가("yes"/"no")를 기록"""
+    if not path:
+        return
+    with _log_lock, open(path, "a", encoding="utf-8") as file:
+        file.write(json.dumps({"score": score, "grade": grade}) + "\n")
+
+
+def should_audit(rate=GRADER_AUDIT_RATE, path=GRADER_LOG_FILE):
+    """점수로 판정한 문서를 LLM 으로도 평가해 기록할지 여부 (기록하지 않으면 평가할 이유가 없음)"""
+    return bool(path) and rate > 0 and random.random() < rate
+
+
+def load_thresholds(path=GRADER_CALIBRATION_FILE):
+    """(low, high): low 미만은 "no", high 이상은 "yes", 그 사이는 LLM 으로 평가"""
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        return data["low"], data["high"]
+    return DEFAULT_LOW, DEFAULT_HIGH
+
+
+def fit_thresholds(records, target_precision=0.95, min_support=20):
+    """
+    기록된 (점수, LLM 평가) 로 임계값을 계산
+
+    high: 점수가 high 이상인 문서 중 "yes" 비율이 target_precision 이상이 되는 가장 작은 값
+    low: 점수가 low 미만인 문서 중 "no" 비율이 target_precision 이상이 되는 가장 큰 값
+    """
+    records = sorted(records, key=lambda r: r[0])
+    n = len(records)
+    yes_suffix = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        yes_suffix[i] = yes_suffix[i + 1] + (records[i][1] == "yes")
+
+    high = DEFAULT_HIGH
+    for i in range(n):
+        support = n - i
+        if support < min_support:
+            break
+        if (i == 0 or records[i][0] != records[i - 1][0]) and yes_suffix[i] / support >= target_precision:
+            high = records[i][0]
+            break
+
+    low = DEFAULT_LOW
+    no_count = 0
+    for i in range(n):
+        no_count += records[i][1] == "no"
+        support = i + 1
+        next_score = records[i + 1][0] if i + 1 < n else None
+        # 같은 점수가 경계 양쪽으로 나뉘지 않도록 점수가 바뀌는 위치에서만 확인
+        if next_score is None or next_score == records[i][0]:
+            continue
+        if support >= min_support and no_count / support >= target_precision:
+            low = next_score
+
+    low = min(low, high)
+    return {"low": low, "high": high, "samples": n, "target_precision": target_precision}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 문서 평가 기록으로 reranker 점수 임계값 보정")
+    parser.add_argument("--log", default=GRADER_LOG_FILE)
+    parser.add_argument("--out", default=GRADER_CALIBRATION_FILE)
+    parser.add_argument("--target-precision", type=float, default=0.95)
+    parser.add_argument("--min-support", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.log, "r", encoding="utf-8") as file:
+        records = [
+            (r["score"], r["grade"])
+            for r in (json.loads(line) for line in file if line.strip())
+        ]
+    result = fit_thresholds(records, args.target_precision, args.min_support)
+    with open(args.out, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
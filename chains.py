@@ -2,12 +2,33 @@ from typing import Literal
 
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from langchain_anthropic import ChatAnthropic
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from llm_cache import get_chain_cache
 
 MODEL_NAME = "claude-3-7-sonnet-20250219"
 
+# 테스트/벤치마크에서 ChatAnthropic 대신 사용할 모델 생성 함수 (chain_name, model_name) -> chat model
+_llm_factory = None
+
+
+def set_llm_factory(factory):
+    """create_llm 이 사용할 모델 생성 함수 교체 (None 이면 ChatAnthropic). 체인 생성 전에 호출해야 합니다."""
+    global _llm_factory
+    _llm_factory = factory
+
+
+def create_llm(chain_name, model_name=MODEL_NAME):
+    if _llm_factory is not None:
+        return _llm_factory(chain_name, model_name)
+
+    from langchain_anthropic import ChatAnthropic
+
+    # 모든 체인은 temperature=0 이므로 같은 프롬프트의 응답을 디스크 캐시에서 재사용
+    return ChatAnthropic(
+        model=model_name, temperature=0, cache=get_chain_cache(chain_name)
+    )
+
 
 class RouteQuery(BaseModel):
 
@@ -20,7 +41,7 @@ class RouteQuery(BaseModel):
 
 def create_question_router_chain():
     # LLM 초기화 및 함수 호출을 통한 구조화된 출력 생성
-    llm = ChatAnthropic(model=MODEL_NAME, temperature=0)
+    llm = create_llm("question_router")
     structured_llm_router = llm.with_structured_output(RouteQuery)
 
     # 시스템 메시지와 사용자 질문을 포함한 프롬프트 템플릿 생성
@@ -45,7 +66,7 @@ def create_question_router_chain():
 
 def create_question_rewrite_chain():
     # LLM 설정
-    llm = ChatAnthropic(model=MODEL_NAME, temperature=0)
+    llm = create_llm("question_rewrite")
 
     # Query Rewrite 시스템 프롬프트
     system = """You a question re-writer that converts an input question to a better version that is optimized for CODE SEARCH(github repository). 
@@ -84,7 +105,7 @@ class GradeDocuments(BaseModel):
 
 def create_retrieval_grader_chain():
     # LLM 초기화 및 함수 호출을 통한 구조화된 출력 생성
-    llm = ChatAnthropic(model=MODEL_NAME, temperature=0)
+    llm = create_llm("retrieval_grader")
     structured_llm_grader = llm.with_structured_output(GradeDocuments)
 
     # 시스템 메시지와 사용자 질문을 포함한 프롬프트 템플릿 생성
@@ -119,7 +140,7 @@ class AnswerGroundedness(BaseModel):
 
 def create_groundedness_checker_chain():
     # LLM 설정
-    llm = ChatAnthropic(model=MODEL_NAME, temperature=0)
+    llm = create_llm("groundedness_checker")
     structured_llm_grader = llm.with_structured_output(AnswerGroundedness)
 
     # 프롬프트 설정
@@ -152,7 +173,7 @@ class GradeAnswer(BaseModel):
 
 def create_answer_grade_chain():
     # 함수 호출을 통한 LLM 초기화
-    llm = ChatAnthropic(model=MODEL_NAME, temperature=0)
+    llm = create_llm("answer_grade")
     structured_llm_grader = llm.with_structured_output(GradeAnswer)
 
     # 프롬프트 설정
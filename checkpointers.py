@@ -0,0 +1,352 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from langgraph.checkpoint.memory import MemorySaver
+
+import metrics
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:  # pip install langgraph-checkpoint-sqlite
+    SqliteSaver = None
+
+
+CHECKPOINT_DB_PATH = os.environ.get("CHECKPOINT_DB_PATH", ".cache/checkpoints.sqlite")
+
+
+def _report(backend, threads, checkpoints, size):
+    if not metrics.METRICS_ENABLED:
+        return
+    metrics.registry.set("checkpoint_threads", threads, help="Conversation threads held by the checkpointer", backend=backend)
+    metrics.registry.set("checkpoint_count", checkpoints, help="Checkpoints held by the checkpointer", backend=backend)
+    metrics.registry.set("checkpoint_bytes", size, help="Serialized checkpoint bytes held by the checkpointer", backend=backend)
+
+
+def _record_eviction(backend, reason, count=1):
+    if metrics.METRICS_ENABLED and count:
+        metrics.registry.inc(
+            "checkpoint_evictions_total",
+            count,
+            help="Checkpoints or threads removed by the checkpointer",
+            backend=backend,
+            reason=reason,
+        )
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    메모리 사용량이 제한된 MemorySaver
+
+    - thread (+ checkpoint_ns) 마다 최근 max_history 개의 체크포인트만 유지하고,
+      남은 체크포인트가 참조하지 않는 channel 값(blob)과 writes 를 함께 삭제
+    - ttl 초 동안 사용되지 않은 thread 삭제
+    - thread 수가 max_threads 를 넘거나 전체 크기가 max_bytes 를 넘으면 가장 오래 사용되지 않은 thread 부터 삭제
+      (active_window 초 안에 사용된 thread 는 실행 중일 수 있으므로 제외하며, 이때는 잠시 제한을 넘을 수 있음)
+
+    오래된 체크포인트를 지우므로 get_state_history 로는 최근 max_history 개만 볼 수 있습니다.
+    """
+
+    def __init__(
+        self,
+        max_history=4,
+        max_threads=1000,
+        max_bytes=256 * 1024 * 1024,
+        ttl=6 * 3600,
+        active_window=300,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_history = max(max_history, 1)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # 요청 하나의 실행 시간(REQUEST_DEADLINE_SECONDS)보다 길게 두어야 실행 중인 thread 가 삭제되지 않음
+        self.active_window = active_window
+        self.total_bytes = 0
+        self._lock = threading.RLock()
+        # thread_id -> 마지막 사용 시각 (앞쪽일수록 오래 사용되지 않은 thread)
+        self._threads = OrderedDict()
+        # thread_id -> {("checkpoint" | "writes" | "blob", 저장소 key)}
+        self._keys = defaultdict(set)
+        self._sizes = {}
+        # (thread_id, checkpoint_ns, checkpoint_id) -> channel_versions
+        self._versions = {}
+
+    def _account(self, thread_id, key, size):
+        self.total_bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._keys[thread_id].add(key)
+
+    def _forget(self, thread_id, key):
+        self.total_bytes -= self._sizes.pop(key, 0)
+        self._keys[thread_id].discard(key)
+
+    def _touch(self, thread_id):
+        self._threads[thread_id] = time.monotonic()
+        self._threads.move_to_end(thread_id)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._lock:
+            saved_config = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = saved_config["configurable"]["thread_id"]
+            checkpoint_ns = saved_config["configurable"]["checkpoint_ns"]
+            checkpoint_id = saved_config["configurable"]["checkpoint_id"]
+
+            saved, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint_id]
+            checkpoint_key = (thread_id, checkpoint_ns, checkpoint_id)
+            self._account(thread_id, ("checkpoint", checkpoint_key), len(saved[1]) + len(saved_metadata[1]))
+            self._versions[checkpoint_key] = dict(checkpoint["channel_versions"])
+            for channel, version in new_versions.items():
+                blob_key = (thread_id, checkpoint_ns, channel, version)
+                self._account(thread_id, ("blob", blob_key), len(self.blobs[blob_key][1]))
+
+            self._touch(thread_id)
+            self._prune_history(thread_id, checkpoint_ns)
+            self._evict(keep=thread_id)
+            self._report()
+            return saved_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            thread_id = config["configurable"]["thread_id"]
+            writes_key = (
+                thread_id,
+                config["configurable"].get("checkpoint_ns", ""),
+                config["configurable"]["checkpoint_id"],
+            )
+            size = sum(len(w[2][1]) for w in self.writes.get(writes_key, {}).values())
+            self._account(thread_id, ("writes", writes_key), size)
+            self._touch(thread_id)
+            self._evict(keep=thread_id)
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            # 없는 thread 조회로 storage(defaultdict) 에 빈 항목이 생기지 않도록 함
+            if thread_id not in self.storage:
+                return None
+            if thread_id in self._threads:
+                self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        # 순회 중에 다른 thread 의 put 으로 저장소가 바뀌지 않도록 잠금 안에서 모두 읽음
+        with self._lock:
+            return iter(list(super().list(config, filter=filter, before=before, limit=limit)))
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            self._drop_thread(thread_id)
+            self._report()
+
+    def _prune_history(self, thread_id, checkpoint_ns):
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.max_history:
+            return
+        # checkpoint id 는 시간 순으로 정렬되는 uuid6
+        stale = sorted(checkpoints)[: -self.max_history]
+        for checkpoint_id in stale:
+            checkpoint_key = (thread_id, checkpoint_ns, checkpoint_id)
+            del checkpoints[checkpoint_id]
+            self._versions.pop(checkpoint_key, None)
+            self._forget(thread_id, ("checkpoint", checkpoint_key))
+            self.writes.pop(checkpoint_key, None)
+            self._forget(thread_id, ("writes", checkpoint_key))
+
+        # 남은 체크포인트가 참조하지 않는 channel 값 삭제
+        live = {
+            (thread_id, checkpoint_ns, channel, version)
+            for checkpoint_id in checkpoints
+            for channel, version in self._versions.get((thread_id, checkpoint_ns, checkpoint_id), {}).items()
+        }
+        for kind, blob_key in list(self._keys[thread_id]):
+            if kind == "blob" and blob_key[1] == checkpoint_ns and blob_key not in live:
+                self.blobs.pop(blob_key, None)
+                self._forget(thread_id, (kind, blob_key))
+        _record_eviction("memory", "history", len(stale))
+
+    def _drop_thread(self, thread_id):
+        self.storage.pop(thread_id, None)
+        for kind, key in self._keys.pop(thread_id, ()):
+            self.total_bytes -= self._sizes.pop((kind, key), 0)
+            if kind == "blob":
+                self.blobs.pop(key, None)
+            elif kind == "writes":
+                self.writes.pop(key, None)
+            else:
+                self._versions.pop(key, None)
+        self._threads.pop(thread_id, None)
+
+    def _evict(self, keep=None):
+        now = time.monotonic()
+        if self.ttl is not None:
+            for thread_id, last_used in list(self._threads.items()):
+                if now - last_used <= self.ttl:
+                    break
+                if thread_id != keep:
+                    self._drop_thread(thread_id)
+                    _record_eviction("memory", "ttl")
+
+        while len(self._threads) > self.max_threads or (
+            self.max_bytes is not None and self.total_bytes > self.max_bytes
+        ):
+            # 가장 오래 사용되지 않은 thread 도 active_window 안에 사용되었으면 나머지도 모두 사용 중
+            victim = next((t for t in self._threads if t != keep), None)
+            if victim is None or now - self._threads[victim] < self.active_window:
+                break
+            reason = "max_threads" if len(self._threads) > self.max_threads else "max_bytes"
+            self._drop_thread(victim)
+            _record_eviction("memory", reason)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threads": len(self._threads),
+                "checkpoints": len(self._versions),
+                "bytes": self.total_bytes,
+            }
+
+    def _report(self):
+        _report("memory", len(self._threads), len(self._versions), self.total_bytes)
+
+
+if SqliteSaver is not None:
+
+    class CompactingSqliteSaver(SqliteSaver):
+        """
+        오래된 체크포인트를 주기적으로 정리하는 SqliteSaver
+
+        put 이 compact_every 번 호출될 때마다 compact() 를 실행해
+        thread 마다 최근 max_history 개의 체크포인트만 남기고, ttl 초 동안 사용되지 않은 thread 는 삭제합니다.
+        SqliteSaver 는 비동기 메서드를 지원하지 않으므로 async 그래프를 위해 스레드에서 실행하는 a* 메서드를 추가합니다.
+        """
+
+        def __init__(self, conn, max_history=4, ttl=7 * 86400, compact_every=100, **kwargs):
+            super().__init__(conn, **kwargs)
+            self.max_history = max(max_history, 1)
+            self.ttl = ttl
+            self.compact_every = compact_every
+            self._puts = 0
+
+        def setup(self):
+            if self.is_setup:
+                return
+            # 새로 만드는 DB 파일에서만 적용됨 (삭제된 페이지를 compact() 에서 반환)
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            super().setup()
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+            )
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            saved_config = super().put(config, checkpoint, metadata, new_versions)
+            with self.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO thread_activity (thread_id, last_used) VALUES (?, ?) "
+                    "ON CONFLICT(thread_id) DO UPDATE SET last_used = excluded.last_used",
+                    (str(saved_config["configurable"]["thread_id"]), time.time()),
+                )
+            self._puts += 1
+            if self.compact_every and self._puts % self.compact_every == 0:
+                self.compact()
+            return saved_config
+
+        def delete_thread(self, thread_id):
+            super().delete_thread(thread_id)
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+
+        def compact(self):
+            with self.cursor() as cur:
+                if self.ttl is not None:
+                    cutoff = time.time() - self.ttl
+                    expired = "SELECT thread_id FROM thread_activity WHERE last_used < ?"
+                    cur.execute(f"DELETE FROM writes WHERE thread_id IN ({expired})", (cutoff,))
+                    cur.execute(f"DELETE FROM checkpoints WHERE thread_id IN ({expired})", (cutoff,))
+                    cur.execute("DELETE FROM thread_activity WHERE last_used < ?", (cutoff,))
+                    _record_eviction("sqlite", "ttl", cur.rowcount)
+
+                cur.execute(
+                    """
+                    DELETE FROM checkpoints WHERE rowid IN (
+                        SELECT rowid FROM (
+                            SELECT rowid, ROW_NUMBER() OVER (
+                                PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                            ) AS position
+                            FROM checkpoints
+                        ) WHERE position > ?
+                    )
+                    """,
+                    (self.max_history,),
+                )
+                _record_eviction("sqlite", "history", cur.rowcount)
+                cur.execute(
+                    """
+                    DELETE FROM writes WHERE NOT EXISTS (
+                        SELECT 1 FROM checkpoints c
+                        WHERE c.thread_id = writes.thread_id
+                          AND c.checkpoint_ns = writes.checkpoint_ns
+                          AND c.checkpoint_id = writes.checkpoint_id
+                    )
+                    """
+                )
+                cur.execute("PRAGMA incremental_vacuum").fetchall()
+            self._report()
+
+        def stats(self):
+            with self.cursor(transaction=False) as cur:
+                threads, checkpoints, checkpoint_bytes = cur.execute(
+                    "SELECT COUNT(DISTINCT thread_id), COUNT(*), "
+                    "COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints"
+                ).fetchone()
+                (writes_bytes,) = cur.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()
+            return {"threads": threads, "checkpoints": checkpoints, "bytes": checkpoint_bytes + writes_bytes}
+
+        def _report(self):
+            stats = self.stats()
+            _report("sqlite", stats["threads"], stats["checkpoints"], stats["bytes"])
+
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            items = await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+            )
+            for item in items:
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def create_checkpointer(kind="bounded", path=CHECKPOINT_DB_PATH, **kwargs):
+    """
+    Args:
+        kind: "memory"(제한 없는 MemorySaver), "bounded"(BoundedMemorySaver), "sqlite"(CompactingSqliteSaver)
+        path: sqlite 체크포인트 DB 경로
+        kwargs: 선택한 체크포인터의 제한 설정 (max_history, ttl 등)
+    """
+    if kind == "memory":
+        return MemorySaver()
+    if kind == "bounded":
+        return BoundedMemorySaver(**kwargs)
+    if kind == "sqlite":
+        if SqliteSaver is None:
+            raise ImportError("sqlite 체크포인터를 사용하려면 langgraph-checkpoint-sqlite 를 설치하세요.")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        return CompactingSqliteSaver(conn, **kwargs)
+    raise ValueError(f"Unknown checkpointer: {kind}")
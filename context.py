@@ -0,0 +1,150 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+
+# 토큰 수 근사치 (Claude 토크나이저 기준 영어/코드는 대략 4자당 1토큰)
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 3000
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text, max_tokens):
+    """max_tokens 에 맞게 자르되 가능하면 줄/단어 경계에서 자름"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # 뒤에 붙는 " …" 만큼 여유를 둠
+    limit = max_tokens * CHARS_PER_TOKEN - 2
+    cut = text[:limit]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > limit // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + " …"
+
+
+@dataclass
+class ContextStats:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+    truncated: int = 0
+
+    @property
+    def tokens_saved(self):
+        return self.input_tokens - self.output_tokens
+
+
+class ContextAssembler:
+    """
+    답변 생성과 groundedness 검사에 넣을 문맥을 구성
+
+    1. 공백을 정규화한 뒤 완전히 같은 문서 제거
+    2. 단어 shingle 의 MinHash 로 유사도가 similarity 이상인 문서 중 순위가 낮은 쪽 제거
+    3. 관련도 순서로 token_budget 까지 채우고, 남은 예산이 min_tail_tokens 이상이면 마지막 문서는 잘라서 포함
+    """
+
+    def __init__(
+        self,
+        token_budget=DEFAULT_TOKEN_BUDGET,
+        max_passage_tokens=None,
+        similarity=0.8,
+        shingle_size=5,
+        num_perm=64,
+        min_tail_tokens=64,
+        seed=1,
+    ):
+        self.token_budget = token_budget
+        self.max_passage_tokens = max_passage_tokens
+        self.similarity = similarity
+        self.shingle_size = shingle_size
+        self.min_tail_tokens = min_tail_tokens
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text):
+        words = _WORD.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return {" ".join(words)}
+        return {
+            " ".join(words[i : i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signature(self, text):
+        hashes = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little")
+                for s in self._shingles(text)
+            ),
+            dtype=np.uint64,
+        ) % _MERSENNE_PRIME
+        # (a * h + b) mod p 의 최솟값 (a, h < 2^31 이므로 uint64 에서 넘치지 않음)
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def deduplicate(self, passages):
+        """(인덱스, 텍스트) 목록에서 중복을 제거. 앞쪽(관련도가 높은) 문서를 남김"""
+        seen, signatures, kept = set(), [], []
+        exact = near = 0
+        for index, text in passages:
+            normalized = _WHITESPACE.sub(" ", text).strip().lower()
+            if not normalized or normalized in seen:
+                exact += 1
+                continue
+            seen.add(normalized)
+            signature = self.signature(normalized)
+            if any(np.mean(signature == other) >= self.similarity for other in signatures):
+                near += 1
+                continue
+            signatures.append(signature)
+            kept.append((index, text))
+        return kept, exact + near
+
+    def assemble(self, documents, scores=None):
+        """
+        Args:
+            documents: 문서 텍스트 목록 (리트리버/웹 검색 순서)
+            scores: documents 와 같은 순서의 관련도 점수. 없으면 주어진 순서를 관련도 순으로 간주
+
+        Returns:
+            (문맥 텍스트 목록, ContextStats). 문맥은 원래 문서 순서를 유지
+        """
+        stats = ContextStats(input_tokens=sum(estimate_tokens(d) for d in documents))
+        order = list(range(len(documents)))
+        if scores and len(scores) == len(documents):
+            order.sort(key=lambda i: -scores[i] if scores[i] is not None else float("inf"))
+
+        passages, stats.duplicates = self.deduplicate([(i, documents[i]) for i in order])
+
+        selected = {}
+        remaining = self.token_budget
+        for index, text in passages:
+            if self.max_passage_tokens is not None and estimate_tokens(text) > self.max_passage_tokens:
+                text = truncate_to_tokens(text, self.max_passage_tokens)
+                stats.truncated += 1
+            tokens = estimate_tokens(text)
+            if remaining is not None and tokens > remaining:
+                if remaining < min(self.min_tail_tokens, self.token_budget):
+                    stats.dropped += 1
+                    continue
+                text = truncate_to_tokens(text, remaining)
+                tokens = estimate_tokens(text)
+                stats.truncated += 1
+            selected[index] = text
+            if remaining is not None:
+                remaining -= tokens
+
+        context = [selected[i] for i in sorted(selected)]
+        stats.output_tokens = sum(estimate_tokens(text) for text in context)
+        return context, stats
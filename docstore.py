@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from typing import Dict, List, Union
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+
+DOCSTORE_FILE = "docstore.sqlite"
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    chunk 본문과 metadata 를 SQLite 파일에 보관하는 docstore
+
+    index.pkl 처럼 모든 Document 를 메모리에 올리지 않고, 검색 결과로 선택된 id 의 내용만 읽습니다.
+    연결은 스레드별로 생성합니다.
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self._local = threading.local()
+        if not readonly:
+            conn = self._connection()
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    id TEXT PRIMARY KEY,
+                    page_content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS id_map (position INTEGER PRIMARY KEY, doc_id TEXT NOT NULL)"
+            )
+            conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            else:
+                conn = sqlite3.connect(self.path)
+                conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._connection().execute(
+            "SELECT page_content, metadata FROM documents WHERE id = ?", (search,)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO documents (id, page_content, metadata) VALUES (?, ?, ?)",
+            [
+                (doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False))
+                for doc_id, doc in texts.items()
+            ],
+        )
+        conn.commit()
+
+    def delete(self, ids: List) -> None:
+        conn = self._connection()
+        conn.executemany("DELETE FROM documents WHERE id = ?", [(i,) for i in ids])
+        conn.commit()
+
+    def load_id_map(self):
+        """FAISS 벡터 위치 -> docstore id"""
+        rows = self._connection().execute("SELECT position, doc_id FROM id_map")
+        return {position: doc_id for position, doc_id in rows}
+
+    def save_id_map(self, index_to_docstore_id):
+        conn = self._connection()
+        conn.execute("DELETE FROM id_map")
+        conn.executemany(
+            "INSERT INTO id_map (position, doc_id) VALUES (?, ?)",
+            list(index_to_docstore_id.items()),
+        )
+        conn.commit()
+
+
+def docstore_path(db_index):
+    return os.path.join(db_index, DOCSTORE_FILE)
+
+
+def stage_docstore(path):
+    """
+    path 의 복사본(path + ".staging")을 쓰기용으로 열어 반환
+    변경은 복사본에만 기록되므로 실행 중인 앱은 publish_docstore 로 교체될 때까지 기존 파일을 그대로 읽음
+    """
+    staging = path + ".staging"
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(staging + suffix):
+            os.remove(staging + suffix)
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    target = sqlite3.connect(staging)
+    source.backup(target)
+    source.close()
+    target.close()
+    return SQLiteDocstore(staging)
+
+
+def publish_docstore(store, path):
+    """
+    준비한 docstore 파일로 path 를 원자적으로 교체 (이미 열린 연결은 교체 전 파일을 계속 읽음)
+
+    SQLite 는 -wal 파일이 있으면 헤더와 무관하게 적용하므로 기존 파일의 -wal/-shm 은 먼저 지우고,
+    새 파일은 rollback journal 모드로 바꿔 두어 읽기 전용 연결이 -wal 을 다시 만들지 않도록 함
+    """
+    conn = store._connection()
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+    store._local = threading.local()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.replace(store.path, path)
+    store.path = path
+
+
+def convert_pickle(db_index):
+    """기존 index.pkl (InMemoryDocstore, id 매핑) 을 docstore.sqlite 로 변환"""
+    with open(os.path.join(db_index, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    path = docstore_path(db_index)
+    if os.path.exists(path):
+        os.remove(path)
+    store = SQLiteDocstore(path)
+    store.add(
+        {
+            doc_id: docstore.search(doc_id)
+            for doc_id in index_to_docstore_id.values()
+        }
+    )
+    store.save_id_map(index_to_docstore_id)
+    store._connection().execute("VACUUM")
+    # 읽기 전용 연결이 -wal/-shm 파일을 만들지 않도록 rollback journal 모드로 저장
+    store._connection().execute("PRAGMA journal_mode=DELETE")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="index.pkl 을 SQLite docstore 로 변환")
+    parser.add_argument("--db-index", default="LANGCHAIN_DB_INDEX")
+    args = parser.parse_args()
+
+    path = convert_pickle(args.db_index)
+    print(
+        f"{os.path.join(args.db_index, 'index.pkl')} "
+        f"({os.path.getsize(os.path.join(args.db_index, 'index.pkl'))} bytes) -> "
+        f"{path} ({os.path.getsize(path)} bytes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+from uuid import uuid4
+
+import metrics
+import tracing
+
+
+# 프로세스마다 이 경로에 pid 를 붙인 spool 파일을 사용 (예: .cache/feedback_spool.1234.jsonl)
+FEEDBACK_SPOOL_PATH = os.environ.get("FEEDBACK_SPOOL_PATH", ".cache/feedback_spool.jsonl")
+
+
+def process_spool_path(base=FEEDBACK_SPOOL_PATH, pid=None):
+    """
+    프로세스별 spool 파일 경로.
+    Streamlit 앱과 server.py 가 같은 파일을 다시 쓰면(os.replace) 서로의 항목을 지우므로 파일을 나눔
+    """
+    root, ext = os.path.splitext(base)
+    return f"{root}.{os.getpid() if pid is None else pid}{ext}"
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        # Windows 의 os.kill 은 프로세스를 종료하므로 확인하지 않고 실행 중으로 간주
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def orphaned_spools(base=FEEDBACK_SPOOL_PATH):
+    """종료된 프로세스가 남긴 spool 파일 (이전 버전의 공유 spool 파일 포함)"""
+    root, ext = os.path.splitext(base)
+    paths = [base] if os.path.exists(base) else []
+    for path in glob.glob(f"{glob.escape(root)}.*{ext}"):
+        pid = path[len(root) + 1 : len(path) - len(ext)]
+        if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            paths.append(path)
+    return paths
+
+
+class FeedbackQueue:
+    """
+    LangSmith 피드백 전송 대기열
+
+    enqueue() 는 항목을 로컬 파일(spool)에 기록한 뒤 바로 반환하고, 백그라운드 스레드가 한 번에 batch_size 개까지
+    전송합니다. LangSmith 에는 피드백 일괄 생성 API 가 없으므로 항목마다 create_feedback 을 한 번씩 호출합니다.
+    전송에 실패한 항목은 지수 백오프로 max_attempts 번까지 다시 시도합니다.
+    spool 파일에는 아직 전송되지 않은 항목만 남고, 종료된 프로세스의 spool 파일은 다음에 시작한 프로세스가
+    가져와 이어서 전송합니다.
+    항목마다 feedback_id 를 미리 정해 두어 재시도해도 중복 생성되지 않습니다.
+    """
+
+    def __init__(
+        self,
+        client_factory,
+        spool_path=None,
+        batch_size=20,
+        flush_interval=2.0,
+        max_attempts=5,
+        backoff=1.0,
+    ):
+        self.client_factory = client_factory
+        # 지정하지 않으면 프로세스별 spool 파일을 사용하고 종료된 프로세스의 spool 도 가져옴
+        self.spool_path = spool_path or process_spool_path()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._client = None
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.sent = 0
+        self.failed = 0
+        self.last_flush_seconds = None
+        directory = os.path.dirname(self.spool_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._load_spool(self.spool_path)
+        if spool_path is None:
+            self._adopt_spools()
+
+    def _load_spool(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    self._items.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # 기록 도중 중단되어 잘린 줄
+                    continue
+
+    def _adopt_spools(self):
+        claimed = []
+        for i, path in enumerate(orphaned_spools()):
+            target = f"{self.spool_path}.adopt{i}"
+            try:
+                # 여러 프로세스가 동시에 시작해도 이름을 바꾼 한 프로세스만 가져감
+                os.rename(path, target)
+            except OSError:
+                continue
+            self._load_spool(target)
+            claimed.append(target)
+        if claimed:
+            # 가져온 항목을 자신의 spool 에 기록한 뒤에 원래 파일을 삭제
+            self._write_spool()
+            for path in claimed:
+                os.remove(path)
+
+    def _write_spool(self):
+        # 남은 항목만 다시 기록 (임시 파일에 쓴 뒤 교체해 중간에 중단되어도 파일이 깨지지 않음)
+        temp_path = self.spool_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for item in self._items:
+                file.write(json.dumps(item, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.spool_path)
+
+    def enqueue(self, run_id, key, score=None, comment=None):
+        # 피드백을 받은 실행은 샘플링되지 않았어도 trace 를 전송.
+        # 전송할 수 없는 실행(LangSmith 에 없는 run)의 피드백은 보내지 않음
+        if not tracing.record_feedback(run_id):
+            if metrics.METRICS_ENABLED:
+                metrics.registry.inc("feedback_skipped_total", help="Feedback for runs whose trace was not exported")
+            return False
+        item = {
+            "feedback_id": str(uuid4()),
+            "run_id": str(run_id),
+            "key": key,
+            "score": score,
+            "comment": comment,
+            "attempts": 0,
+            "next_attempt": 0.0,
+        }
+        with self._lock:
+            with open(self.spool_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(item, ensure_ascii=False) + "\n")
+            self._items.append(item)
+            self._report()
+        self.start()
+        self._wakeup.set()
+        return True
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="feedback-flush", daemon=True)
+                self._thread.start()
+        return self._thread
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                # 한 번에 batch_size 개씩, 보낼 수 있는 항목이 없을 때까지 전송
+                while self.flush():
+                    pass
+            except Exception as e:
+                print(f"Feedback flush failed: {e!r}")
+
+    def _send(self, item):
+        if self._client is None:
+            self._client = self.client_factory()
+        kwargs = {"score": item["score"]} if item["score"] is not None else {"comment": item["comment"]}
+        self._client.create_feedback(
+            item["run_id"],
+            item["key"],
+            feedback_id=item["feedback_id"],
+            stop_after_attempt=1,
+            **kwargs,
+        )
+
+    def flush(self):
+        """재시도 대기 중이 아닌 항목을 최대 batch_size 개 전송하고, 전송한(또는 포기한) 항목 수를 반환"""
+        now = time.time()
+        with self._lock:
+            batch = [item for item in self._items if item["next_attempt"] <= now][: self.batch_size]
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        finished = []
+        sent = failed = 0
+        for item in batch:
+            try:
+                self._send(item)
+                finished.append(item)
+                sent += 1
+            except Exception as e:
+                item["attempts"] += 1
+                if item["attempts"] >= self.max_attempts:
+                    print(f"Dropping feedback {item['feedback_id']} after {item['attempts']} attempts: {e!r}")
+                    finished.append(item)
+                    failed += 1
+                else:
+                    item["next_attempt"] = time.time() + self.backoff * 2 ** (item["attempts"] - 1)
+        self.last_flush_seconds = time.perf_counter() - started
+        self.sent += sent
+        self.failed += failed
+
+        with self._lock:
+            done = {item["feedback_id"] for item in finished}
+            self._items = deque(item for item in self._items if item["feedback_id"] not in done)
+            self._write_spool()
+            self._report()
+        if metrics.METRICS_ENABLED:
+            metrics.registry.observe("feedback_flush_seconds", self.last_flush_seconds, help="Feedback batch flush latency")
+            metrics.registry.inc("feedback_sent_total", sent, help="Feedback items sent")
+            metrics.registry.inc("feedback_failed_total", failed, help="Feedback items dropped after max_attempts")
+        return len(finished)
+
+    def depth(self):
+        return len(self._items)
+
+    def stats(self):
+        return {
+            "depth": self.depth(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+    def _report(self):
+        if metrics.METRICS_ENABLED:
+            metrics.registry.set("feedback_queue_depth", len(self._items), help="Feedback items waiting to be sent")
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_feedback_queue():
+    """프로세스 전체에서 공유하는 FeedbackQueue (남아 있는 spool 항목이 있으면 바로 전송 시작)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            from langsmith import Client
+
+            _queue = FeedbackQueue(Client)
+            if _queue.depth():
+                _queue.start()
+        return _queue
@@ -0,0 +1,180 @@
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+# 검색 시 파라미터 (정확도와 속도의 trade-off)
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+
+
+def index_path(db_index, index_type="flat"):
+    """index_type 별 인덱스 디렉토리. flat 은 원본 디렉토리를 그대로 사용"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"index_type must be one of {INDEX_TYPES}: {index_type}")
+    if index_type == "flat":
+        return db_index
+    return f"{db_index}_{index_type}"
+
+
+def read_faiss_index(path, mmap=False):
+    """
+    faiss 인덱스 파일 읽기. mmap=True 이면 메모리 맵으로 읽어 여러 프로세스가
+    OS 페이지 캐시의 한 복사본을 공유하도록 합니다. (지원하지 않는 인덱스 형식이면 일반 로드)
+    """
+    # faiss 는 import 비용이 크므로 실제로 인덱스를 다룰 때만 불러옴 (index_path 만 쓰는 경우 제외)
+    import faiss
+
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError as e:
+            print(f"Memory-mapped loading not supported for {path}, loading into RAM: {e}")
+    return faiss.read_index(path)
+
+
+def write_faiss_index(index, path):
+    import faiss
+
+    faiss.write_index(index, path)
+
+
+def apply_search_params(index, ef_search=HNSW_EF_SEARCH, nprobe=IVF_NPROBE):
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    if hasattr(index, "nprobe"):
+        index.nprobe = nprobe
+    return index
+
+
+def _pq_subquantizers(d):
+    # 서브 벡터 차원이 8 이 되도록 하되 d 의 약수여야 함
+    for m in range(max(d // 8, 1), 0, -1):
+        if d % m == 0:
+            return m
+    return 1
+
+
+def build_index(vectors, index_type, metric=None, hnsw_m=32, nlist=None, pq_m=None, nbits=8):
+    import faiss
+
+    if metric is None:
+        metric = faiss.METRIC_L2
+    n, d = vectors.shape
+    if index_type == "flat":
+        index = faiss.IndexFlat(d, metric)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m, metric)
+        index.hnsw.efConstruction = 200
+    elif index_type == "ivfpq":
+        # 학습 데이터가 클러스터당 약 39개 이상이 되도록 nlist 제한
+        nlist = nlist or max(1, min(int(4 * np.sqrt(n)), n // 39))
+        pq_m = pq_m or _pq_subquantizers(d)
+        quantizer = faiss.IndexFlat(d, metric)
+        index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, nbits, metric)
+        index.train(vectors)
+    else:
+        raise ValueError(f"index_type must be one of {INDEX_TYPES}: {index_type}")
+    index.add(vectors)
+    return index
+
+
+def convert_index(db_index, index_type, **kwargs):
+    """flat 인덱스의 벡터로 index_type 인덱스를 만들고 docstore 파일과 함께 저장"""
+    import faiss
+
+    flat = faiss.read_index(os.path.join(db_index, "index.faiss"))
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+
+    started = time.perf_counter()
+    index = build_index(vectors, index_type, metric=flat.metric_type, **kwargs)
+    elapsed = time.perf_counter() - started
+
+    out_dir = index_path(db_index, index_type)
+    os.makedirs(out_dir, exist_ok=True)
+    faiss.write_index(index, os.path.join(out_dir, "index.faiss"))
+    # 벡터 위치 -> 문서 id 매핑과 docstore 는 그대로 공유
+    for filename in os.listdir(db_index):
+        if filename != "index.faiss":
+            shutil.copy2(os.path.join(db_index, filename), out_dir)
+
+    print(f"Built {index_type} index ({index.ntotal} vectors) in {elapsed:.1f}s -> {out_dir}")
+    return out_dir
+
+
+def recall_at_k(db_index, index_type, k=10, n_queries=200, mmap=False, seed=0):
+    """
+    정확한 flat 인덱스 대비 index_type 인덱스의 recall@k 와 쿼리당 검색 시간
+
+    쿼리는 저장된 벡터에서 샘플링한 뒤 약간의 노이즈를 더해 만듭니다.
+    """
+    import faiss
+
+    exact = faiss.read_index(os.path.join(db_index, "index.faiss"))
+    approx = apply_search_params(
+        read_faiss_index(os.path.join(index_path(db_index, index_type), "index.faiss"), mmap=mmap)
+    )
+
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(exact.ntotal, size=min(n_queries, exact.ntotal), replace=False)
+    queries = exact.reconstruct_batch(ids)
+    queries = queries + rng.normal(scale=0.01, size=queries.shape).astype(np.float32)
+
+    started = time.perf_counter()
+    _, exact_ids = exact.search(queries, k)
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    started = time.perf_counter()
+    _, approx_ids = approx.search(queries, k)
+    approx_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    recall = np.mean(
+        [len(set(a) & set(e)) / k for a, e in zip(approx_ids, exact_ids)]
+    )
+    return {
+        "index_type": index_type,
+        "k": k,
+        "recall": float(recall),
+        "exact_ms_per_query": exact_ms,
+        "approx_ms_per_query": approx_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISS 인덱스 변환 및 recall 측정")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", help="flat 인덱스를 HNSW / IVF-PQ 로 변환")
+    convert.add_argument("--db-index", default="LANGCHAIN_DB_INDEX")
+    convert.add_argument("--type", choices=INDEX_TYPES[1:], required=True)
+    convert.add_argument("--hnsw-m", type=int, default=32)
+    convert.add_argument("--nlist", type=int, default=None)
+    convert.add_argument("--pq-m", type=int, default=None)
+
+    recall = subparsers.add_parser("recall", help="flat 인덱스 대비 recall@k 측정")
+    recall.add_argument("--db-index", default="LANGCHAIN_DB_INDEX")
+    recall.add_argument("--type", choices=INDEX_TYPES[1:], required=True)
+    recall.add_argument("--k", type=int, default=10)
+    recall.add_argument("--queries", type=int, default=200)
+    recall.add_argument("--mmap", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        kwargs = {}
+        if args.type == "hnsw":
+            kwargs["hnsw_m"] = args.hnsw_m
+        else:
+            kwargs.update(nlist=args.nlist, pq_m=args.pq_m)
+        convert_index(args.db_index, args.type, **kwargs)
+    else:
+        print(recall_at_k(args.db_index, args.type, k=args.k, n_queries=args.queries, mmap=args.mmap))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_community.vectorstores.faiss import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from docstore import docstore_path, stage_docstore
+from retrievers import init_embeddings, load_vectorstore, save_vectorstore
+from sparse_index import build_sparse_index, sparse_index_path
+from utils import get_cells, render_cells
+
+
+DB_INDEX = "LANGCHAIN_DB_INDEX"
+MANIFEST_FILE = "ingest_manifest.json"
+
+SOURCE_EXTENSIONS = (".md", ".mdx", ".py", ".ipynb")
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv"}
+
+
+def find_sources(source_dir, extensions=SOURCE_EXTENSIONS):
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith(".")]
+        for filename in sorted(files):
+            if filename.endswith(extensions):
+                yield os.path.join(root, filename)
+
+
+def load_notebook(path):
+    # 프로세스 풀에서 실행되므로 파일을 쓰지 않고 마크다운 문자열만 반환
+    return render_cells(get_cells(path))
+
+
+def load_text(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as file:
+        return file.read()
+
+
+def load_sources(paths, workers=None):
+    """노트북은 프로세스 풀에서 마크다운으로 변환하고, 나머지는 그대로 읽음"""
+    notebooks = [p for p in paths if p.endswith(".ipynb")]
+    texts = {p: load_text(p) for p in paths if not p.endswith(".ipynb")}
+    if notebooks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for path, text in zip(notebooks, executor.map(load_notebook, notebooks, chunksize=8)):
+                texts[path] = text
+    return texts
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_sources(texts, source_dir, chunk_size=1000, chunk_overlap=100):
+    """내용 해시 -> (chunk 텍스트, metadata). 같은 내용의 chunk 는 하나만 유지"""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    chunks = {}
+    for path, text in texts.items():
+        source = os.path.relpath(path, source_dir)
+        for chunk in splitter.split_text(text):
+            chunks.setdefault(chunk_hash(chunk), (chunk, {"source": source}))
+    return chunks
+
+
+def load_manifest(db_index, store):
+    """chunk 해시 -> docstore id. manifest 가 없으면 기존 docstore 내용으로 생성"""
+    path = os.path.join(db_index, MANIFEST_FILE)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    manifest = {}
+    if store is not None:
+        for doc_id in store.index_to_docstore_id.values():
+            doc = store.docstore.search(doc_id)
+            manifest[chunk_hash(doc.page_content)] = doc_id
+    return manifest
+
+
+def save_manifest(db_index, manifest):
+    path = os.path.join(db_index, MANIFEST_FILE)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+
+
+def ingest(
+    source_dir,
+    db_index=DB_INDEX,
+    batch_size=64,
+    workers=None,
+    chunk_size=1000,
+    chunk_overlap=100,
+    delete_stale=True,
+    embeddings=None,
+):
+    """
+    source_dir 의 문서를 db_index 에 증분 반영
+
+    새로 생긴/바뀐 chunk 만 임베딩하고, 원본에서 사라진 chunk 의 벡터는 삭제합니다.
+    """
+    started = time.perf_counter()
+    if embeddings is None:
+        embeddings = init_embeddings()
+
+    store = None
+    if os.path.exists(os.path.join(db_index, "index.faiss")):
+        store = load_vectorstore(db_index, embeddings)
+        if os.path.exists(docstore_path(db_index)):
+            # 실행 중인 앱이 읽는 docstore 는 건드리지 않고 복사본에 기록한 뒤 save_vectorstore 에서 인덱스와 함께 교체
+            store.docstore = stage_docstore(docstore_path(db_index))
+    manifest = load_manifest(db_index, store)
+
+    paths = list(find_sources(source_dir))
+    texts = load_sources(paths, workers=workers)
+    chunks = chunk_sources(texts, source_dir, chunk_size, chunk_overlap)
+    load_seconds = time.perf_counter() - started
+
+    stale = [h for h in manifest if h not in chunks]
+    if delete_stale and stale and store is not None:
+        store.delete([manifest[h] for h in stale])
+        for h in stale:
+            del manifest[h]
+
+    new = [h for h in chunks if h not in manifest]
+    embed_started = time.perf_counter()
+    for i in range(0, len(new), batch_size):
+        batch = new[i : i + batch_size]
+        batch_texts = [chunks[h][0] for h in batch]
+        vectors = embeddings.embed_documents(batch_texts)
+        metadatas = [chunks[h][1] for h in batch]
+        if store is None:
+            store = FAISS.from_embeddings(
+                list(zip(batch_texts, vectors)), embeddings, metadatas=metadatas, ids=batch
+            )
+        else:
+            store.add_embeddings(list(zip(batch_texts, vectors)), metadatas=metadatas, ids=batch)
+        for h in batch:
+            manifest[h] = h
+    embed_seconds = time.perf_counter() - embed_started
+
+    if store is not None:
+        save_vectorstore(store, db_index)
+        save_manifest(db_index, manifest)
+        # hybrid 검색용 BM25 인덱스가 있으면 같은 docstore 로 다시 생성
+        if os.path.exists(sparse_index_path(db_index)) and (new or stale):
+            build_sparse_index(store, db_index)
+
+    report = {
+        "files": len(paths),
+        "chunks": len(chunks),
+        "added": len(new),
+        "deleted": len(stale) if delete_stale else 0,
+        "unchanged": len(chunks) - len(new),
+        "load_seconds": round(load_seconds, 2),
+        "embed_seconds": round(embed_seconds, 2),
+        "chunks_per_second": round(len(new) / embed_seconds, 1) if embed_seconds > 0 else 0.0,
+        "total_seconds": round(time.perf_counter() - started, 2),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="소스 저장소를 FAISS 인덱스에 증분 반영")
+    parser.add_argument("source_dir")
+    parser.add_argument("--db-index", default=DB_INDEX)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument(
+        "--keep-stale", action="store_true", help="원본에서 사라진 chunk 를 삭제하지 않음"
+    )
+    args = parser.parse_args()
+
+    report = ingest(
+        args.source_dir,
+        db_index=args.db_index,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        delete_stale=not args.keep_stale,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+import metrics
+
+
+# 캐시 파일 위치 및 크기 제한 (환경 변수로 변경 가능)
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 50_000))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+class SQLiteLLMCache:
+    """
+    LLM 응답을 저장하는 SQLite 저장소
+
+    키는 llm_string(모델 이름, 파라미터, structured output 스키마로 바인딩된 tool 정의 포함)과
+    렌더링된 프롬프트의 해시입니다. 항목 수/전체 크기가 한도를 넘으면 가장 오래 사용되지 않은
+    항목부터 제거합니다.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        key = self.make_key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        try:
+            return [loads(generation) for generation in json.loads(row[0])]
+        except Exception:
+            # 직렬화 형식이 바뀐 항목은 캐시 미스로 처리
+            return None
+
+    def update(self, prompt, llm_string, return_val):
+        key = self.make_key(prompt, llm_string)
+        response = json.dumps([dumps(generation) for generation in return_val])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, response, len(response), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        while count > self.max_entries or size > self.max_bytes:
+            # 한 번에 약 10% 를 제거해 매 업데이트마다 삭제가 일어나지 않도록 함
+            n = max(1, count // 10)
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed LIMIT ?)",
+                (n,),
+            )
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def size(self):
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        return {"entries": count, "bytes": size}
+
+
+class ChainLLMCache(BaseCache):
+    """체인별 hit/miss 를 집계하는 공유 저장소의 뷰"""
+
+    def __init__(self, store, chain_name):
+        self.store = store
+        self.chain_name = chain_name
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, prompt, llm_string):
+        result = self.store.lookup(prompt, llm_string)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if metrics.METRICS_ENABLED:
+            metrics.registry.inc(
+                "llm_cache_lookups_total",
+                help="LLM response cache lookups",
+                chain=self.chain_name,
+                result="miss" if result is None else "hit",
+            )
+        return result
+
+    def update(self, prompt, llm_string, return_val):
+        self.store.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs):
+        self.store.clear()
+
+
+_store = None
+_store_lock = threading.Lock()
+_chain_caches = {}
+# 캐시를 사용하지 않을 체인 이름 목록 (예: LLM_CACHE_DISABLED="rag,general_answer")
+_disabled_chains = {
+    name.strip()
+    for name in os.environ.get("LLM_CACHE_DISABLED", "").split(",")
+    if name.strip()
+}
+_enabled = os.environ.get("LLM_CACHE_ENABLED", "true").lower() != "false"
+
+
+def configure_llm_cache(enabled=None, disabled_chains=None):
+    """캐시 전체 또는 체인별 사용 여부 설정. 체인 생성 전에 호출해야 적용됩니다."""
+    global _enabled, _disabled_chains
+    if enabled is not None:
+        _enabled = enabled
+    if disabled_chains is not None:
+        _disabled_chains = set(disabled_chains)
+
+
+def get_chain_cache(chain_name):
+    """chain_name 체인의 LLM 에 전달할 캐시. 비활성화된 경우 None"""
+    global _store
+    if not _enabled or chain_name in _disabled_chains:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteLLMCache()
+        if chain_name not in _chain_caches:
+            _chain_caches[chain_name] = ChainLLMCache(_store, chain_name)
+        return _chain_caches[chain_name]
+
+
+def cache_stats():
+    """체인별 hit/miss 및 hit rate"""
+    stats = {}
+    for name, cache in _chain_caches.items():
+        total = cache.hits + cache.misses
+        stats[name] = {
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "hit_rate": cache.hits / total if total else 0.0,
+        }
+    return stats
@@ -2,20 +2,37 @@ import streamlit as st
 from langchain_core.messages.chat import ChatMessage
 
 from dotenv import load_dotenv
-from streamlit_wrapper import create_graph, stream_graph
-from langchain_teddynote import logging
+from streamlit_wrapper import stream_graph
+from resources import get_checkpointer, get_graph, get_semantic_cache, reload_index_if_changed
+from startup import is_ready, start_warmup, wait_until_ready
 from langsmith import Client
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_teddynote.messages import random_uuid
+from uuid import uuid4
+import os
+from metrics import serve_metrics
+from feedback import get_feedback_queue
+from tracing import TRACING_MODE, ensure_tracing
+from budget import exhausted_message
 
 load_dotenv()
 
+# 임베딩 모델, reranker, 인덱스, 그래프를 백그라운드에서 미리 로드합니다. (프로세스당 한 번)
+start_warmup()
+
+# METRICS_PORT 가 설정되어 있으면 /metrics (Prometheus), /traces (JSON) 를 제공합니다.
+if os.environ.get("METRICS_PORT"):
+    serve_metrics(int(os.environ["METRICS_PORT"]))
+
+
+def random_uuid():
+    return str(uuid4())
+
 # 프로젝트 이름을 입력합니다.
 LANGSMITH_PROJECT = "SURFEE_BOARD_ASSISTANT"
 
-# LangSmith 추적을 설정합니다.
-logging.langsmith(LANGSMITH_PROJECT)
+# LangSmith 추적을 설정합니다. (TRACING_MODE: full / sampled / off)
+ensure_tracing(TRACING_MODE, LANGSMITH_PROJECT)
 
 
 NAMESPACE = "langchain"
@@ -92,18 +109,18 @@ if "open_feedback" not in st.session_state:
 
 
 def submit_feedback():
-    client = st.session_state["langsmith_client"]
-    if client:
-        feedback = st.session_state.feedback
-        run = next(iter(client.list_runs(project_name=LANGSMITH_PROJECT, limit=1)))
-        parent_run_id = run.parent_run_ids[0]
-
-        for key, value in feedback.items():
-            if key in ["올바른 답변", "도움됨", "구체성"]:
-                client.create_feedback(parent_run_id, key, score=value)
-            elif key == "의견":
-                if value:
-                    client.create_feedback(parent_run_id, key, comment=value)
+    # 답변을 생성한 그래프 실행의 run_id 로 피드백을 대기열에 넣고 바로 반환 (전송은 백그라운드에서 진행)
+    run_id = st.session_state.get("run_id")
+    if run_id is None:
+        return
+    queue = get_feedback_queue()
+    feedback = st.session_state.feedback
+    for key, value in feedback.items():
+        if key in ["올바른 답변", "도움됨", "구체성"]:
+            queue.enqueue(run_id, key, score=value)
+        elif key == "의견":
+            if value:
+                queue.enqueue(run_id, key, comment=value)
 
 
 @st.dialog("답변 평가")
@@ -125,9 +142,9 @@ def feedback():
         st.rerun()
 
 
-# 체인 생성
-if "graph" not in st.session_state:
-    st.session_state["graph"] = create_graph()
+# 그래프는 프로세스 전체에서 공유합니다. (세션별 상태는 체크포인터의 thread_id 로만 구분)
+# 디스크의 인덱스가 바뀌었으면 백그라운드에서 다시 로드합니다. (로드가 끝나면 새 그래프로 교체)
+reload_index_if_changed()
 
 
 @st.dialog("답변 평가")
@@ -174,6 +191,8 @@ def feedback():
 if clear_btn:
     st.session_state["open_feedback"] = False
     st.session_state["messages"] = []
+    # 이전 대화의 체크포인트는 더 이상 사용되지 않으므로 바로 삭제
+    get_checkpointer().delete_thread(st.session_state["thread_id"])
     st.session_state["thread_id"] = random_uuid()
     
 # 이전 대화 기록 출력
@@ -187,25 +206,40 @@ if user_input:
     st.session_state["open_feedback"] = False
     # 사용자의 입력을 화면에 표시
     st.chat_message("user", avatar="🙎‍♂️").write(user_input)
-    # 세션 상태에서 그래프 객체를 가져옴
-    graph = st.session_state["graph"]
+    # 백그라운드 로드가 끝나지 않았으면 기다린 뒤 공유 그래프 객체를 가져옴
+    if not is_ready():
+        with st.spinner("모델을 불러오는 중입니다..."):
+            wait_until_ready()
+    graph = get_graph()
 
     # AI 답변을 화면에 표시
     with st.chat_message("assistant", avatar="😊"):
         streamlit_container = st.empty()
-        
-        # 그래프를 호출하여 응답 생성
+        # 답변 토큰이 스트리밍될 컨테이너
+        answer_container = st.empty()
+
+        # 그래프를 호출하여 응답 생성 (피드백을 연결할 run_id 를 미리 정함)
+        run_id = uuid4()
         response = stream_graph(
             graph,
             user_input,
             streamlit_container,
-            thread_id=st.session_state["thread_id"]
+            thread_id=st.session_state["thread_id"],
+            cache=get_semantic_cache(),
+            answer_container=answer_container,
+            run_id=run_id,
         )
+        st.session_state["run_id"] = run_id
 
         # 응답에서 AI 답변 추출
         ai_answer = response["generation"]
 
-        st.write(ai_answer)
+        # 스트리밍된 답변을 최종 답변으로 교체
+        answer_container.markdown(ai_answer)
+
+        # 예산(제한 시간/LLM 호출 수)이 소진되어 검증을 마치지 못한 답변이면 알림
+        if response.get("budget_exhausted"):
+            st.caption(exhausted_message(response["budget_exhausted"]))
 
         # 평가 폼을 위한 빈 컨테이너 생성
         eval_container = st.empty()
@@ -0,0 +1,332 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import var_child_runnable_config
+
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() != "false"
+# 요청별 trace 를 JSONL 로 기록할 파일 (비어 있으면 메모리에만 보관)
+METRICS_TRACE_FILE = os.environ.get("METRICS_TRACE_FILE", "")
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 검색 단계(dense/hybrid, rerank)처럼 수 ms 단위로 끝나는 작업용
+FAST_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+_current_span = contextvars.ContextVar("metrics_current_span", default=None)
+_current_trace = contextvars.ContextVar("metrics_current_trace", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """프로세스 내 counter / histogram 집계 및 Prometheus text format 출력"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, help="", **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._help.setdefault(name, ("counter", help))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, help="", **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._help.setdefault(name, ("gauge", help))
+            self._gauges[key] = value
+
+    def observe(self, name, value, buckets=DURATION_BUCKETS, help="", **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help))
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets)
+            self._histograms[key].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            for name, (kind, help) in sorted(self._help.items()):
+                if help:
+                    lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind in ("counter", "gauge"):
+                    values = self._counters if kind == "counter" else self._gauges
+                    for (n, labels), value in sorted(values.items()):
+                        if n == name:
+                            lines.append(f"{name}{self._labels(labels)} {value}")
+                    continue
+                for (n, labels), hist in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {hist.count}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {hist.sum}")
+                    lines.append(f"{name}_count{self._labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+_recent_traces = deque(maxlen=200)
+_trace_file_lock = threading.Lock()
+
+
+class RequestTrace:
+    """요청 하나에서 실행된 노드들의 구조화된 기록"""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.time()
+        self.duration = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add_span(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        return {
+            "request_id": self.request_id,
+            "started": self.started,
+            "duration_s": self.duration,
+            "spans": list(self.spans),
+        }
+
+
+def _graph_node():
+    # LangGraph 가 실행 중인 그래프 노드 이름 (조건부 엣지는 출발 노드 이름)
+    config = var_child_runnable_config.get() or {}
+    return config.get("metadata", {}).get("langgraph_node", "")
+
+
+def _new_span(node):
+    return {
+        "node": node,
+        "graph_node": _graph_node(),
+        "started": time.time(),
+        "duration_s": None,
+        "llm_calls": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "documents": None,
+        "route": None,
+        "context_tokens_saved": None,
+    }
+
+
+def record_result(span, result):
+    # 라우팅 함수는 문자열(선택한 경로)을, 노드는 상태 업데이트(dict)를 반환
+    if isinstance(result, str):
+        span["route"] = result
+    elif isinstance(result, dict) and "documents" in result:
+        span["documents"] = len(result["documents"])
+
+
+def record_context(stats):
+    """문맥 구성(context.ContextAssembler) 결과를 현재 노드 span 과 counter 에 기록"""
+    span = _current_span.get()
+    if span is not None:
+        span["context_tokens_saved"] = stats.tokens_saved
+    registry.inc("context_input_tokens_total", stats.input_tokens, help="Estimated context tokens before assembly")
+    registry.inc("context_tokens_saved_total", stats.tokens_saved, help="Estimated context tokens removed by dedup and budget")
+    registry.inc("context_duplicates_total", stats.duplicates, help="Duplicate passages removed from context")
+
+
+def _finish_span(span, started):
+    span["duration_s"] = time.perf_counter() - started
+    node = span["node"]
+    registry.observe("node_duration_seconds", span["duration_s"], help="Node wall time", node=node)
+    registry.observe("node_llm_calls", span["llm_calls"], buckets=COUNT_BUCKETS, help="LLM calls per node run", node=node)
+    # graph_node 로 같은 노드 클래스의 다른 사용처(query_expand / query_rewrite 등)를 구분
+    registry.inc("node_runs_total", help="Node executions", node=node, graph_node=span["graph_node"])
+    if span["documents"] is not None:
+        registry.observe("node_documents", span["documents"], buckets=COUNT_BUCKETS, help="Documents returned by node", node=node)
+    if span["route"] is not None:
+        registry.inc("route_total", help="Routing decisions", node=node, route=span["route"])
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(span)
+
+
+@contextmanager
+def node_span(node):
+    """노드 실행 구간을 측정. 그 안에서의 LLM 호출/토큰은 MetricsCallbackHandler 가 이 span 에 기록"""
+    span = _new_span(node)
+    token = _current_span.set(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+        _finish_span(span, started)
+
+
+def instrument_route(func):
+    """라우팅 함수(state -> 경로 이름)에 측정 추가"""
+
+    @functools.wraps(func)
+    def wrapper(state):
+        if not METRICS_ENABLED:
+            return func(state)
+        with node_span(func.__name__) as span:
+            route = func(state)
+            record_result(span, route)
+        return route
+
+    return wrapper
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LLM 호출 수와 입력/출력 토큰 수를 현재 노드 span 과 전역 counter 에 기록"""
+
+    def _node(self):
+        span = _current_span.get()
+        return span, (span["node"] if span is not None else "unknown")
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._on_start()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._on_start()
+
+    def _on_start(self):
+        span, node = self._node()
+        if span is not None:
+            span["llm_calls"] += 1
+        registry.inc("llm_calls_total", help="LLM calls", node=node)
+
+    def on_llm_end(self, response, **kwargs):
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+        span, node = self._node()
+        if span is not None:
+            span["input_tokens"] += input_tokens
+            span["output_tokens"] += output_tokens
+        registry.inc("llm_input_tokens_total", input_tokens, help="LLM input tokens", node=node)
+        registry.inc("llm_output_tokens_total", output_tokens, help="LLM output tokens", node=node)
+
+
+_callback_handler = MetricsCallbackHandler()
+
+
+def callbacks():
+    """그래프 실행 config 에 추가할 callback 목록 (비활성화 시 빈 목록)"""
+    return [_callback_handler] if METRICS_ENABLED else []
+
+
+@contextmanager
+def request_trace(request_id):
+    """요청 하나의 trace 를 수집하고 끝나면 최근 trace 목록(및 METRICS_TRACE_FILE)에 기록"""
+    if not METRICS_ENABLED:
+        yield None
+        return
+    trace = RequestTrace(request_id)
+    token = _current_trace.set(trace)
+    started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.duration = time.perf_counter() - started
+        registry.observe("request_duration_seconds", trace.duration, help="End-to-end request time")
+        _recent_traces.append(trace.to_dict())
+        if METRICS_TRACE_FILE:
+            with _trace_file_lock, open(METRICS_TRACE_FILE, "a", encoding="utf-8") as file:
+                file.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+
+
+def recent_traces():
+    return list(_recent_traces)
+
+
+def to_prometheus():
+    return registry.to_prometheus()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = to_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        elif self.path == "/traces":
+            body = json.dumps(recent_traces(), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def serve_metrics(port):
+    """/metrics (Prometheus) 와 /traces (JSON) 를 제공하는 HTTP 서버를 백그라운드로 시작"""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
@@ -1,4 +1,10 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
 from langchain_core.documents import Document
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from chains import (
     create_question_router_chain,
     create_question_rewrite_chain,
@@ -7,9 +13,77 @@ from chains import (
     create_answer_grade_chain,
 )
 from tools import create_web_search_tool
+from router import LocalRouter, router_stats
+from calibration import load_thresholds, log_grade, should_audit
 
 from states import GraphState
 from abc import ABC, abstractmethod
+import budget
+import metrics
+
+# rag_answer 로 진행하기 위해 필요한 최소 관련 문서 수
+MIN_RELEVANT_DOCS = 2
+
+
+def record_budget_skip(step, reason):
+    if metrics.METRICS_ENABLED:
+        metrics.registry.inc(
+            "budget_skipped_total",
+            help="Optional steps skipped to stay within the request budget",
+            step=step,
+            reason=reason,
+        )
+
+
+class SpeculationStats:
+    """
+    speculative 실행 통계. 미리 실행했다가 버려진 작업의 양을 기록해
+    지연 시간 단축과 API 비용 증가를 비교할 수 있도록 합니다. (metrics 의 speculation_* counter 로도 기록)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.launched = 0
+            self.wasted = 0
+            self.wasted_llm_calls = 0
+            self.wasted_retrievals = 0
+            self.wasted_seconds = 0.0
+
+    def record_launch(self):
+        with self._lock:
+            self.launched += 1
+        if metrics.METRICS_ENABLED:
+            metrics.registry.inc("speculation_launched_total", help="Speculative executions started")
+
+    def record_waste(self, llm_calls=0, retrievals=0, seconds=0.0):
+        with self._lock:
+            self.wasted += 1
+            self.wasted_llm_calls += llm_calls
+            self.wasted_retrievals += retrievals
+            self.wasted_seconds += seconds
+        if metrics.METRICS_ENABLED:
+            metrics.registry.inc("speculation_wasted_total", help="Speculative executions whose result was discarded")
+            metrics.registry.inc("speculation_wasted_llm_calls_total", llm_calls, help="LLM calls made by discarded speculation")
+            metrics.registry.inc("speculation_wasted_retrievals_total", retrievals, help="Retrievals made by discarded speculation")
+            metrics.registry.inc("speculation_wasted_seconds_total", seconds, help="Time spent on discarded speculation")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "launched": self.launched,
+                "wasted": self.wasted,
+                "waste_rate": self.wasted / self.launched if self.launched else 0.0,
+                "wasted_llm_calls": self.wasted_llm_calls,
+                "wasted_retrievals": self.wasted_retrievals,
+                "wasted_seconds": self.wasted_seconds,
+            }
+
+
+speculation_stats = SpeculationStats()
 
 
 ### 예시 ###
@@ -24,6 +98,10 @@ class BaseNode(ABC):
     def execute(self, state: GraphState) -> GraphState:
         pass
 
+    async def aexecute(self, state: GraphState) -> GraphState:
+        # 비동기 구현이 없는 노드는 별도 스레드에서 동기 구현을 실행
+        return await asyncio.to_thread(self.execute, state)
+
     def logging(self, method_name, **kwargs):
         if self.verbose:
             print(f"[{self.name}] {method_name}")
@@ -31,7 +109,20 @@ class BaseNode(ABC):
                 print(f"{key}: {value}")
 
     def __call__(self, state: GraphState):
-        return self.execute(state)
+        if not metrics.METRICS_ENABLED:
+            return self.execute(state)
+        with metrics.node_span(self.name) as span:
+            result = self.execute(state)
+            metrics.record_result(span, result)
+        return result
+
+    async def acall(self, state: GraphState):
+        if not metrics.METRICS_ENABLED:
+            return await self.aexecute(state)
+        with metrics.node_span(self.name) as span:
+            result = await self.aexecute(state)
+            metrics.record_result(span, result)
+        return result
 
 
 class RouteQuestionNode(BaseNode):
@@ -44,12 +135,173 @@ class RouteQuestionNode(BaseNode):
         question = state["question"]
         evaluation = self.router_chain.invoke({"question": question})
 
+        return self._route(evaluation)
+
+    async def aexecute(self, state: GraphState) -> str:
+        question = state["question"]
+        evaluation = await self.router_chain.ainvoke({"question": question})
+        return self._route(evaluation)
+
+    def _route(self, evaluation):
         if evaluation.binary_score == "yes":
             return "query_expansion"
         else:
             return "general_answer"
 
 
+class LocalRouteQuestionNode(RouteQuestionNode):
+    """
+    임베딩 기반 로컬 라우터(router.LocalRouter)로 먼저 판단하고,
+    확신이 없는 경우에만 LLM 라우터(create_question_router_chain)를 호출하는 노드
+    """
+
+    def __init__(self, vectorstore, **kwargs):
+        router_kwargs = {
+            key: kwargs.pop(key)
+            for key in ("high", "low", "centroid_margin", "centroids_path", "log_path", "shadow_rate")
+            if key in kwargs
+        }
+        super().__init__(**kwargs)
+        self.name = "LocalRouteQuestionNode"
+        self.local_router = LocalRouter(vectorstore, **router_kwargs)
+
+    def _finish(self, question, local_route, score, llm_route):
+        if local_route is None:
+            router_stats.record(local=False)
+            self.local_router.log_decision(question, llm_route, score)
+            return llm_route
+        if llm_route is not None:
+            router_stats.record(local=True, shadow=True, agree=llm_route == local_route)
+            self.local_router.log_decision(question, llm_route, score)
+        else:
+            router_stats.record(local=True)
+        return local_route
+
+    def execute(self, state: GraphState) -> str:
+        question = state["question"]
+        local_route, score = self.local_router.decide(question)
+        llm_route = None
+        # 확신이 없거나 shadow 비교 대상이면 LLM 라우터 호출
+        if local_route is None or self.local_router.should_shadow():
+            llm_route = super().execute(state)
+        return self._finish(question, local_route, score, llm_route)
+
+    async def aexecute(self, state: GraphState) -> str:
+        question = state["question"]
+        local_route, score = await asyncio.to_thread(self.local_router.decide, question)
+        llm_route = None
+        if local_route is None or self.local_router.should_shadow():
+            llm_route = await super().aexecute(state)
+        return self._finish(question, local_route, score, llm_route)
+
+
+def document_scores(documents):
+    # RerankRetriever 가 기록한 relevance_score (문서 평가 단계에서 사용)
+    scores = [doc.metadata.get("relevance_score") for doc in documents]
+    return [float(score) if score is not None else None for score in scores]
+
+
+class SpeculativeRouteNode(BaseNode):
+    """
+    질문 라우팅과 질문 재작성(선택적으로 문서 검색까지)을 동시에 실행하는 노드
+
+    재작성은 라우팅 결과와 무관하므로 미리 시작하고, 라우터가 "general_answer" 를
+    선택하면 그 결과를 버리고 낭비된 작업을 speculation_stats 에 기록합니다.
+    """
+
+    def __init__(self, router=None, retriever=None, **kwargs):
+        super().__init__(**kwargs)
+        self.name = "SpeculativeRouteNode"
+        self.router = router if router is not None else RouteQuestionNode()
+        self.rewriter_chain = create_question_rewrite_chain()
+        self.retriever = retriever
+
+    def _expand(self, question):
+        started = time.monotonic()
+        better_question = self.rewriter_chain.invoke({"question": question})
+        documents = None
+        if self.retriever is not None:
+            documents = self.retriever.invoke(better_question)
+        return better_question, documents, time.monotonic() - started
+
+    async def _aexpand(self, question):
+        better_question = await self.rewriter_chain.ainvoke({"question": question})
+        documents = None
+        if self.retriever is not None:
+            documents = await self.retriever.ainvoke(better_question)
+        return better_question, documents
+
+    def _update(self, state, route, better_question, documents):
+        update = GraphState(
+            route=route,
+            question=better_question,
+            rewrite_count=state.get("rewrite_count", 0) + 1,
+            llm_calls=budget.charge(state, 1),
+        )
+        if documents is not None:
+            update["documents"] = [doc.page_content for doc in documents]
+            update["document_scores"] = document_scores(documents)
+        return update
+
+    def _record_waste(self, future):
+        # 버려진 작업이 끝난 뒤에 실제 소요 시간을 기록
+        try:
+            _, _, elapsed = future.result()
+        except Exception:
+            elapsed = 0.0
+        speculation_stats.record_waste(
+            llm_calls=1,
+            retrievals=1 if self.retriever is not None else 0,
+            seconds=elapsed,
+        )
+
+    def execute(self, state: GraphState) -> GraphState:
+        question = state["question"]
+        speculation_stats.record_launch()
+        executor = ContextThreadPoolExecutor(max_workers=1)
+        expansion = executor.submit(self._expand, question)
+        executor.shutdown(wait=False)
+
+        route = self.router.execute(state)
+        if route == "general_answer":
+            expansion.add_done_callback(self._record_waste)
+            # 버려진 질문 재작성도 LLM 호출 수에 포함
+            return GraphState(route=route, llm_calls=budget.charge(state, 1))
+
+        better_question, documents, _ = expansion.result()
+        return self._update(state, route, better_question, documents)
+
+    async def aexecute(self, state: GraphState) -> GraphState:
+        question = state["question"]
+        speculation_stats.record_launch()
+        started = time.monotonic()
+        expansion = asyncio.create_task(self._aexpand(question))
+
+        try:
+            route = await self.router.aexecute(state)
+        except BaseException:
+            expansion.cancel()
+            raise
+        if route == "general_answer":
+            # 비동기 모드에서는 진행 중인 요청을 취소해 불필요한 비용을 줄임
+            expansion.cancel()
+            speculation_stats.record_waste(
+                llm_calls=1,
+                retrievals=1 if self.retriever is not None else 0,
+                seconds=time.monotonic() - started,
+            )
+            return GraphState(route=route, llm_calls=budget.charge(state, 1))
+
+        better_question, documents = await expansion
+        return self._update(state, route, better_question, documents)
+
+
+@metrics.instrument_route
+def route_from_state(state):
+    # SpeculativeRouteNode 가 기록한 라우팅 결과
+    return state["route"]
+
+
 class QueryRewriteNode(BaseNode):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -59,7 +311,19 @@ class QueryRewriteNode(BaseNode):
     def execute(self, state: GraphState) -> GraphState:
         question = state["question"]
         better_question = self.rewriter_chain.invoke({"question": question})
-        return GraphState(question=better_question)
+        return self._update(state, better_question)
+
+    async def aexecute(self, state: GraphState) -> GraphState:
+        question = state["question"]
+        better_question = await self.rewriter_chain.ainvoke({"question": question})
+        return self._update(state, better_question)
+
+    def _update(self, state, better_question):
+        return GraphState(
+            question=better_question,
+            rewrite_count=state.get("rewrite_count", 0) + 1,
+            llm_calls=budget.charge(state, 1),
+        )
 
 
 class RetrieveNode(BaseNode):
@@ -72,7 +336,18 @@ class RetrieveNode(BaseNode):
         question = state["question"]
         documents = self.retriever.invoke(question)
         #return GraphState(documents=documents)
-        return GraphState(documents=[doc.page_content for doc in documents])
+        return GraphState(
+            documents=[doc.page_content for doc in documents],
+            document_scores=document_scores(documents),
+        )
+
+    async def aexecute(self, state: GraphState) -> GraphState:
+        question = state["question"]
+        documents = await self.retriever.ainvoke(question)
+        return GraphState(
+            documents=[doc.page_content for doc in documents],
+            document_scores=document_scores(documents),
+        )
 
 class GeneralAnswerNode(BaseNode):
     def __init__(self, llm, **kwargs):
@@ -83,27 +358,85 @@ class GeneralAnswerNode(BaseNode):
     def execute(self, state: GraphState) -> GraphState:
         question = state["question"]
         answer = self.llm.invoke(question)
-        return GraphState(generation=answer.content)
+        return GraphState(generation=answer.content, llm_calls=budget.charge(state, 1))
+
+    async def aexecute(self, state: GraphState) -> GraphState:
+        question = state["question"]
+        answer = await self.llm.ainvoke(question)
+        return GraphState(generation=answer.content, llm_calls=budget.charge(state, 1))
 
 
 class RagAnswerNode(BaseNode):
-    def __init__(self, rag_chain, **kwargs):
+    def __init__(self, rag_chain, assembler=None, **kwargs):
+        """
+        Args:
+            assembler: context.ContextAssembler. 있으면 중복 제거/토큰 예산 적용한 문맥으로 답변을 생성하고
+                같은 문맥을 state["context"] 에 남겨 groundedness 검사에서 재사용
+        """
         super().__init__(**kwargs)
         self.name = "RagAnswerNode"
         self.rag_chain = rag_chain
+        self.assembler = assembler
+
+    def _context(self, state):
+        documents = state["documents"]
+        if self.assembler is None:
+            return documents
+        context, stats = self.assembler.assemble(documents, state.get("document_scores"))
+        if metrics.METRICS_ENABLED:
+            metrics.record_context(stats)
+        return context
 
     def execute(self, state: GraphState) -> GraphState:
         question = state["question"]
-        documents = state["documents"]
-        answer = self.rag_chain.invoke({"context": documents, "question": question})
-        return GraphState(generation=answer)
+        context = self._context(state)
+        answer = self.rag_chain.invoke({"context": context, "question": question})
+        return self._update(state, answer, context)
+
+    async def aexecute(self, state: GraphState) -> GraphState:
+        question = state["question"]
+        context = self._context(state)
+        answer = await self.rag_chain.ainvoke(
+            {"context": context, "question": question}
+        )
+        return self._update(state, answer, context)
+
+    def _update(self, state, answer, context):
+        # 바로 이어지는 답변 검증(조건부 엣지라 상태를 갱신할 수 없음)의 호출 수도 여기서 미리 계산
+        return GraphState(
+            generation=answer,
+            context=context,
+            llm_calls=budget.charge(state, budget.ANSWER_LLM_CALLS),
+        )
 
 
 class FilteringDocumentsNode(BaseNode):
-    def __init__(self, **kwargs):
+    def __init__(
+        self,
+        concurrency=1,
+        timeout=None,
+        early_exit=False,
+        score_filter=False,
+        thresholds=None,
+        **kwargs,
+    ):
+        """
+        Args:
+            concurrency: 동시에 평가할 문서 수 (1 이면 기존처럼 순차 평가)
+            timeout: 문서 하나당 평가 제한 시간(초). 초과하면 "no" 로 처리
+            early_exit: 관련 문서가 MIN_RELEVANT_DOCS 개 모이면 나머지 평가를 기다리지 않음
+            score_filter: reranker 점수가 high 이상이면 "yes", low 미만이면 "no" 로 바로 판정하고
+                그 사이의 문서만 LLM 으로 평가 (보정용으로 GRADER_AUDIT_RATE 비율은 LLM 으로도 평가)
+            thresholds: (low, high). 없으면 calibration.load_thresholds() 결과 사용
+        """
         super().__init__(**kwargs)
         self.name = "FilteringDocumentsNode"
         self.retrieval_grader = create_retrieval_grader_chain()
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.early_exit = early_exit
+        self.score_filter = score_filter
+        self.low, self.high = thresholds if thresholds is not None else load_thresholds()
     '''
     def execute(self, state: GraphState) -> GraphState:
         question = state["question"]
@@ -122,15 +455,201 @@ class FilteringDocumentsNode(BaseNode):
     def execute(self, state: GraphState) -> GraphState:
         question = state["question"]
         documents = state["documents"]
-    
-        filtered_docs = []
-        for d in documents:
+        scores = self._scores(state)
+        relevant, borderline = self._prefilter(scores)
+
+        if not borderline or self._enough(relevant):
+            return self._result(state, scores, relevant)
+        if self._over_budget(state, borderline):
+            return self._result(state, scores, relevant | set(borderline))
+
+        # 제한 시간은 스레드에서 실행해야 적용할 수 있으므로 timeout 이 있으면 순차 평가도 이 경로로 실행
+        if self.timeout is not None or (self.concurrency > 1 and len(borderline) > 1):
+            graded, graded_calls = self._grade_concurrently(
+                question, documents, scores, borderline, len(relevant)
+            )
+            return self._result(state, scores, relevant | graded, graded_calls)
+
+        graded_calls = 0
+        for i in borderline:
             # d는 이미 str이라고 가정 (아니면 doc.page_content → d로 바꿔야 함)
-            score = self.retrieval_grader.invoke({"question": question, "document": d})
+            score = self.retrieval_grader.invoke({"question": question, "document": documents[i]})
+            graded_calls += 1
+            self._log_grade(scores[i], score.binary_score)
             if score.binary_score == "yes":
-                filtered_docs.append(d)
-    
-        return GraphState(documents=filtered_docs)  # 이때 documents는 List[str]
+                relevant.add(i)
+                if self._enough(relevant):
+                    break
+
+        return self._result(state, scores, relevant, graded_calls)  # 이때 documents는 List[str]
+
+    def _scores(self, state):
+        # 검색 단계의 reranker 점수 (웹 검색 결과 등 점수가 없으면 None)
+        scores = state.get("document_scores") or []
+        if len(scores) != len(state["documents"]):
+            return [None] * len(state["documents"])
+        return list(scores)
+
+    def _prefilter(self, scores):
+        """점수로 확실한 문서는 바로 판정하고, 경계 구간 문서의 인덱스만 LLM 평가 대상으로 반환"""
+        relevant, borderline = set(), []
+        for i, score in enumerate(scores):
+            if not self.score_filter or score is None:
+                borderline.append(i)
+            elif (score >= self.high or score < self.low) and should_audit():
+                # 임계값 바깥 문서도 일부는 LLM 평가 결과를 기록해 calibration 이 치우치지 않도록 함
+                borderline.append(i)
+            elif score >= self.high:
+                relevant.add(i)
+            elif score >= self.low:
+                borderline.append(i)
+        skipped = len(scores) - len(borderline)
+        if skipped and metrics.METRICS_ENABLED:
+            metrics.registry.inc(
+                "grader_llm_calls_skipped_total",
+                value=skipped,
+                help="Documents graded by reranker score without an LLM call",
+            )
+        return relevant, borderline
+
+    def _over_budget(self, state, borderline):
+        """
+        경계 구간 문서를 평가하고 답변까지 마칠 예산이 없으면 True.
+        이때는 LLM 평가를 건너뛰고 경계 구간 문서를 그대로 사용 (reranker 가 낮게 본 문서는 이미 제외됨)
+        """
+        waves = -(-len(borderline) // max(self.concurrency, 1))
+        reason = budget.shortfall(
+            state,
+            len(borderline) + budget.ANSWER_LLM_CALLS,
+            seconds=(waves + budget.ANSWER_LLM_CALLS) * budget.SECONDS_PER_LLM_CALL,
+        )
+        if reason is None:
+            return False
+        self.logging("grading_skipped", reason=reason, documents=len(borderline))
+        record_budget_skip("grade_documents", reason)
+        return True
+
+    def _enough(self, relevant):
+        return self.early_exit and len(relevant) >= MIN_RELEVANT_DOCS
+
+    def _log_grade(self, score, grade):
+        if score is not None:
+            log_grade(score, grade)
+
+    def _result(self, state, scores, relevant, graded_calls=0):
+        # 원래 문서 순서(reranker 순위)를 유지
+        documents = state["documents"]
+        kept = [i for i in range(len(documents)) if i in relevant]
+        return GraphState(
+            documents=[documents[i] for i in kept],
+            document_scores=[scores[i] for i in kept],
+            llm_calls=budget.charge(state, graded_calls),
+        )
+
+    def _grade(self, question, document, started, index):
+        # 평가 시작 시각을 기록해 두어야 대기열에 있던 시간은 제한 시간에서 제외됨
+        started[index] = time.monotonic()
+        score = self.retrieval_grader.invoke({"question": question, "document": document})
+        return score.binary_score
+
+    def _grade_concurrently(self, question, documents, scores, indices, accepted=0):
+        started = {}
+        relevant = set()
+        waiting = list(indices)
+        pending = {}
+        # 제한 시간을 넘긴 평가는 끝날 때까지 스레드를 점유하므로, 문서 수만큼 스레드를 두고
+        # 동시에 평가하는 문서 수(concurrency)는 직접 제한 (버린 평가가 대기 중인 평가를 막지 않도록)
+        executor = ContextThreadPoolExecutor(max_workers=len(indices))
+
+        def fill():
+            while waiting and len(pending) < max(self.concurrency, 1):
+                index = waiting.pop(0)
+                pending[executor.submit(self._grade, question, documents[index], started, index)] = index
+
+        try:
+            fill()
+            while pending:
+                done, _ = wait(
+                    pending, timeout=self._poll_interval(), return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        grade = future.result()
+                    except Exception as e:
+                        # 평가 실패 문서는 관련 없음("no")으로 처리
+                        self.logging("grade_failed", index=index, error=e)
+                        continue
+                    self._log_grade(scores[index], grade)
+                    if grade == "yes":
+                        relevant.add(index)
+
+                if self.early_exit and accepted + len(relevant) >= MIN_RELEVANT_DOCS:
+                    break
+
+                # 제한 시간을 넘긴 문서는 "no" 로 처리하고 더 이상 기다리지 않음
+                if self.timeout is not None:
+                    now = time.monotonic()
+                    for future, index in list(pending.items()):
+                        if index in started and now - started[index] > self.timeout:
+                            self.logging("grade_timeout", index=index)
+                            del pending[future]
+                fill()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # 평가를 시작한 문서 수 = 사용한 LLM 호출 수
+        return relevant, len(started)
+
+    async def aexecute(self, state: GraphState) -> GraphState:
+        question = state["question"]
+        documents = state["documents"]
+        scores = self._scores(state)
+        relevant, borderline = self._prefilter(scores)
+        if not borderline or self._enough(relevant):
+            return self._result(state, scores, relevant)
+        if self._over_budget(state, borderline):
+            return self._result(state, scores, relevant | set(borderline))
+
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        graded_calls = 0
+
+        async def grade(index, document):
+            nonlocal graded_calls
+            async with semaphore:
+                graded_calls += 1
+                try:
+                    score = await asyncio.wait_for(
+                        self.retrieval_grader.ainvoke(
+                            {"question": question, "document": document}
+                        ),
+                        timeout=self.timeout,
+                    )
+                except Exception as e:
+                    # 제한 시간 초과/평가 실패 문서는 "no" 로 처리
+                    self.logging("grade_failed", index=index, error=e)
+                    return index, False
+                self._log_grade(scores[index], score.binary_score)
+                return index, score.binary_score == "yes"
+
+        tasks = [asyncio.create_task(grade(i, documents[i])) for i in borderline]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, is_relevant = await next_done
+                if is_relevant:
+                    relevant.add(index)
+                if self._enough(relevant):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return self._result(state, scores, relevant, graded_calls)
+
+    def _poll_interval(self):
+        if self.timeout is None:
+            return None
+        return min(self.timeout, 0.1)
 
 
 class WebSearchNode(BaseNode):
@@ -162,21 +681,90 @@ class WebSearchNode(BaseNode):
             if "content" in web_result
         ]
     
-        return GraphState(documents=web_contents)  # List[str]
+        return GraphState(documents=web_contents, document_scores=[])  # List[str]
+
+    async def aexecute(self, state: GraphState) -> GraphState:
+        question = state["question"]
+        web_results = await self.web_search_tool.ainvoke({"query": question})
+        web_contents = [
+            web_result["content"]
+            for web_result in web_results
+            if "content" in web_result
+        ]
+        return GraphState(documents=web_contents, document_scores=[])
 
 
 class AnswerGroundednessCheckNode(BaseNode):
-    def __init__(self, **kwargs):
+    def __init__(self, parallel=False, **kwargs):
+        """
+        Args:
+            parallel: True 이면 groundedness 검사와 답변 관련성 검사를 동시에 실행
+                (groundedness 가 "no" 이면 관련성 검사는 낭비된 작업으로 기록)
+        """
         super().__init__(**kwargs)
         self.name = "AnswerGroundednessCheckNode"
         self.groundedness_checker = create_groundedness_checker_chain()
         self.relevant_answer_checker = create_answer_grade_chain()
+        self.parallel = parallel
+
+    def _verdict(self, groundedness, relevance):
+        if groundedness.binary_score != "yes":
+            return "not grounded"
+        if relevance.binary_score == "yes":
+            return "relevant"
+        return "not relevant"
+
+    def _budget_plan(self, state):
+        """
+        예산에 따른 검사 방식
+            "skip": 제한 시각이 지났거나 검증에 실패해도 다시 답변할 예산이 없으므로, 검사 없이
+                지금까지의 답변을 검증 미완료(budget_exhausted)로 종료 (검사 결과로 바꿀 수 있는 것이 없음)
+            None: 모든 검사 실행
+        """
+        if budget.remaining_seconds(state) <= 0:
+            record_budget_skip("answer_check", "deadline")
+            return "skip"
+        reason = budget.shortfall(state, budget.RETRY_LLM_CALLS["not relevant"])
+        if reason is not None:
+            record_budget_skip("answer_check", reason)
+            return "skip"
+        return None
+
+    def _route(self, state, verdict):
+        # 검증에 실패했지만 다시 답변할 예산이 없으면 지금까지의 답변으로 종료
+        if verdict != "relevant" and budget.shortfall(state, budget.RETRY_LLM_CALLS[verdict]):
+            return "budget_exhausted"
+        return verdict
 
     def execute(self, state: GraphState) -> GraphState:
         question = state["question"]
-        documents = state["documents"]
+        # RagAnswerNode 가 답변 생성에 사용한 문맥으로 검사
+        documents = state.get("context") or state["documents"]
         generation = state["generation"]
 
+        plan = self._budget_plan(state)
+        if plan == "skip":
+            return "budget_exhausted"
+
+        if self.parallel:
+            speculation_stats.record_launch()
+            started = time.monotonic()
+            with ContextThreadPoolExecutor(max_workers=2) as executor:
+                groundedness = executor.submit(
+                    self.groundedness_checker.invoke,
+                    {"documents": documents, "generation": generation},
+                )
+                relevance = executor.submit(
+                    self.relevant_answer_checker.invoke,
+                    {"question": question, "generation": generation},
+                )
+                verdict = self._verdict(groundedness.result(), relevance.result())
+            if verdict == "not grounded":
+                speculation_stats.record_waste(
+                    llm_calls=1, seconds=time.monotonic() - started
+                )
+            return self._route(state, verdict)
+
         score = self.groundedness_checker.invoke(
             {"documents": documents, "generation": generation}
         )
@@ -188,17 +776,85 @@ class AnswerGroundednessCheckNode(BaseNode):
             if score.binary_score == "yes":
                 return "relevant"
             else:
-                return "not relevant"
+                return self._route(state, "not relevant")
         else:
-            return "not grounded"
+            return self._route(state, "not grounded")
+
+    async def aexecute(self, state: GraphState) -> str:
+        question = state["question"]
+        # RagAnswerNode 가 답변 생성에 사용한 문맥으로 검사
+        documents = state.get("context") or state["documents"]
+        generation = state["generation"]
+
+        plan = self._budget_plan(state)
+        if plan == "skip":
+            return "budget_exhausted"
+
+        if self.parallel:
+            speculation_stats.record_launch()
+            started = time.monotonic()
+            groundedness, relevance = await asyncio.gather(
+                self.groundedness_checker.ainvoke(
+                    {"documents": documents, "generation": generation}
+                ),
+                self.relevant_answer_checker.ainvoke(
+                    {"question": question, "generation": generation}
+                ),
+            )
+            verdict = self._verdict(groundedness, relevance)
+            if verdict == "not grounded":
+                speculation_stats.record_waste(
+                    llm_calls=1, seconds=time.monotonic() - started
+                )
+            return self._route(state, verdict)
+
+        score = await self.groundedness_checker.ainvoke(
+            {"documents": documents, "generation": generation}
+        )
+        if score.binary_score != "yes":
+            return self._route(state, "not grounded")
+
+        score = await self.relevant_answer_checker.ainvoke(
+            {"question": question, "generation": generation}
+        )
+        if score.binary_score == "yes":
+            return "relevant"
+        else:
+            return self._route(state, "not relevant")
+
+
+class BudgetExhaustedNode(BaseNode):
+    """
+    답변 검증을 마치지 못하고 예산(제한 시각/LLM 호출 수)이 소진된 경우 지금까지의 답변을 유지한 채
+    budget_exhausted 에 이유를 기록하는 노드
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.name = "BudgetExhaustedNode"
+
+    def execute(self, state: GraphState) -> GraphState:
+        reason = budget.shortfall(state, budget.RETRY_LLM_CALLS["not grounded"]) or "llm_budget"
+        self.logging("budget_exhausted", reason=reason, llm_calls=state.get("llm_calls"))
+        if metrics.METRICS_ENABLED:
+            metrics.registry.inc(
+                "budget_exhausted_total",
+                help="Requests that stopped before the answer was verified",
+                reason=reason,
+            )
+        return GraphState(budget_exhausted=reason)
+
+    async def aexecute(self, state: GraphState) -> GraphState:
+        return self.execute(state)
 
 
 # 추가 정보 검색 필요성 여부 평가 노드
+@metrics.instrument_route
 def decide_to_web_search_node(state):
     # 문서 검색 결과 가져오기
     filtered_docs = state["documents"]
 
-    if len(filtered_docs) < 2:
+    if len(filtered_docs) < MIN_RELEVANT_DOCS:
         return "web_search"
     else:
         return "rag_answer"
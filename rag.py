@@ -1,8 +1,8 @@
 from langchain_core.output_parsers import StrOutputParser
 #from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
 from operator import itemgetter
 from langchain_core.prompts import load_prompt
+from chains import create_llm
 
 
 def create_rag_chain(prompt_name="code-rag-prompt", model_name="claude-3-7-sonnet-20250219"):
@@ -10,7 +10,7 @@ def create_rag_chain(prompt_name="code-rag-prompt", model_name="claude-3-7-sonne
     rag_prompt = load_prompt(f"prompts/{prompt_name}.yaml")
 
     # llm 설정
-    llm = ChatAnthropic(model_name=model_name, temperature=0)
+    llm = create_llm("rag", model_name=model_name)
 
     # 체인(Chain) 생성
     rag_chain = (
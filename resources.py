@@ -0,0 +1,249 @@
+import os
+import threading
+
+from semantic_cache import SemanticCache
+from retrievers import EMBEDDING_MODEL_NAME, init_embeddings, init_reranker, init_retriever
+
+
+DB_INDEX = "LANGCHAIN_DB_INDEX"
+# 벡터 인덱스 형식("flat", "hnsw", "ivfpq")과 메모리 맵 로드 여부
+INDEX_TYPE = os.environ.get("INDEX_TYPE", "flat")
+INDEX_MMAP = os.environ.get("INDEX_MMAP", "false").lower() == "true"
+# 검색 방식 ("dense" 또는 "hybrid")
+RETRIEVER_MODE = os.environ.get("RETRIEVER_MODE", "dense")
+# dense 점수가 확실히 갈리는 질의는 reranker 에 넘기는 후보 수를 줄임
+RERANK_ADAPTIVE = os.environ.get("RERANK_ADAPTIVE", "").lower() in ("1", "true", "yes")
+# 질문 라우터 ("llm" 또는 "local")
+ROUTER_MODE = os.environ.get("ROUTER_MODE", "llm")
+# local 라우터의 유사도 임계값 (high 이상은 문서 검색, low 이하는 일반 답변, 그 사이는 LLM 라우터)
+ROUTER_HIGH = float(os.environ.get("ROUTER_HIGH", "0.5"))
+ROUTER_LOW = float(os.environ.get("ROUTER_LOW", "0.25"))
+# local 라우터가 확신한 질문 중 LLM 라우터와 비교(shadow)할 비율
+ROUTER_SHADOW_RATE = float(os.environ.get("ROUTER_SHADOW_RATE", "0.0"))
+# reranker 점수로 확실한 문서는 LLM 평가 없이 판정 (calibration.py 로 임계값 보정)
+GRADING_SCORE_FILTER = os.environ.get("GRADING_SCORE_FILTER", "").lower() in ("1", "true", "yes")
+# 대화 체크포인터 ("bounded", "sqlite", "memory")
+CHECKPOINTER = os.environ.get("CHECKPOINTER", "bounded")
+# 답변 생성에 사용할 문맥의 토큰 예산
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "3000"))
+
+
+class ResourceRegistry:
+    """
+    프로세스 전체에서 공유하는 무거운 리소스(임베딩 모델, 리트리버, 그래프 등) 저장소
+
+    각 리소스는 처음 요청될 때 한 번만 생성되며, 모든 Streamlit 세션이 읽기 전용으로 공유합니다.
+    reload() 로 특정 리소스와 그 리소스에 의존하는 리소스를 다시 만들 수 있습니다.
+    (새 리소스를 모두 만든 뒤 한 번에 교체하므로, 그동안 다른 스레드는 기존 리소스를 사용)
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._factories = {}
+        self._dependencies = {}
+        self._resources = {}
+        self._listeners = []
+        # reload 중인 스레드에서만 보이는 새 리소스
+        self._staged = threading.local()
+
+    def register(self, name, factory, depends_on=()):
+        with self._lock:
+            self._factories[name] = factory
+            self._dependencies[name] = tuple(depends_on)
+            self._resources.pop(name, None)
+
+    def get(self, name):
+        staged = getattr(self._staged, "resources", None)
+        if staged is not None and name in staged:
+            if staged[name] is None:
+                staged[name] = self._factories[name]()
+            return staged[name]
+        # 빠른 경로: 이미 생성된 리소스는 잠금 없이 반환
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+        with self._lock:
+            if name not in self._resources:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown resource: {name}")
+                self._resources[name] = self._factories[name]()
+            return self._resources[name]
+
+    def is_loaded(self, name):
+        return name in self._resources
+
+    def add_reload_listener(self, callback):
+        """리소스가 다시 로드될 때 호출될 callback(names) 등록"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def reload(self, *names):
+        """지정한 리소스와 그 의존 리소스를 다시 생성해 교체"""
+        with self._lock:
+            stale = self._dependents(names)
+        self._staged.resources = dict.fromkeys(stale)
+        try:
+            for name in stale:
+                self.get(name)
+            staged = self._staged.resources
+        finally:
+            self._staged.resources = None
+        with self._lock:
+            self._resources.update(staged)
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback(stale)
+        return stale
+
+    def _dependents(self, names):
+        # names 와 이를 (간접적으로) 의존하는 모든 리소스를 등록 순서대로 반환
+        stale = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for name, deps in self._dependencies.items():
+                if name not in stale and stale.intersection(deps):
+                    stale.add(name)
+                    changed = True
+        return [name for name in self._factories if name in stale]
+
+
+# 인덱스 변경 여부와 무관한 파일: SQLite 가 읽기만 해도 만들거나 갱신하는 파일 (docstore.sqlite-wal 등)과
+# ingest 가 교체 전에 준비 중인 파일 (docstore.sqlite.staging, index.faiss.tmp)
+IGNORED_INDEX_FILE_SUFFIXES = ("-wal", "-shm", "-journal", ".staging", ".tmp")
+
+
+def index_signature(db_index=DB_INDEX):
+    # 인덱스 파일의 (경로, 수정 시각, 크기) 목록. 디스크의 인덱스가 바뀌면 값이 달라짐
+    signature = []
+    if os.path.isdir(db_index):
+        for filename in sorted(os.listdir(db_index)):
+            if filename.endswith(IGNORED_INDEX_FILE_SUFFIXES):
+                continue
+            stat = os.stat(os.path.join(db_index, filename))
+            signature.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _create_checkpointer():
+    from checkpointers import create_checkpointer
+
+    return create_checkpointer(CHECKPOINTER)
+
+
+def _create_graph():
+    from streamlit_wrapper import create_graph
+
+    # 체크포인터는 별도 리소스로 두어 인덱스를 다시 로드해도 대화 기록(thread_id)이 유지되도록 함
+    # async_mode 그래프는 stream_graph 와 astream_graph 모두에서 사용할 수 있음
+    return create_graph(
+        retriever=registry.get("retriever"),
+        checkpointer=registry.get("checkpointer"),
+        async_mode=True,
+        router=ROUTER_MODE,
+        router_kwargs={"high": ROUTER_HIGH, "low": ROUTER_LOW, "shadow_rate": ROUTER_SHADOW_RATE},
+        grading_score_filter=GRADING_SCORE_FILTER,
+        context_token_budget=CONTEXT_TOKEN_BUDGET,
+    )
+
+
+registry = ResourceRegistry()
+_index_signature = None
+_reload_lock = threading.Lock()
+_reload_thread = None
+
+
+def _create_retriever():
+    global _index_signature
+    from index_tools import index_path
+
+    _index_signature = index_signature(index_path(DB_INDEX, INDEX_TYPE))
+    return init_retriever(
+        DB_INDEX,
+        embeddings=registry.get("embeddings"),
+        reranker=registry.get("reranker"),
+        index_type=INDEX_TYPE,
+        mmap=INDEX_MMAP,
+        mode=RETRIEVER_MODE,
+        adaptive_rerank=RERANK_ADAPTIVE,
+    )
+
+
+registry.register("embeddings", lambda: init_embeddings(EMBEDDING_MODEL_NAME))
+registry.register("reranker", init_reranker)
+registry.register(
+    "retriever", _create_retriever, depends_on=("embeddings", "reranker")
+)
+registry.register("checkpointer", _create_checkpointer)
+registry.register("graph", _create_graph, depends_on=("retriever", "checkpointer"))
+registry.register(
+    "semantic_cache",
+    lambda: SemanticCache(registry.get("embeddings")),
+    depends_on=("embeddings",),
+)
+
+
+def _invalidate_caches(names):
+    # 문서 인덱스가 다시 로드되면 캐시된 답변과 rerank 점수를 폐기
+    if "retriever" not in names:
+        return
+    if registry.is_loaded("semantic_cache"):
+        registry.get("semantic_cache").clear()
+    if registry.is_loaded("reranker"):
+        registry.get("reranker").clear()
+
+
+registry.add_reload_listener(_invalidate_caches)
+
+
+def get_embeddings():
+    return registry.get("embeddings")
+
+
+def get_retriever():
+    return registry.get("retriever")
+
+
+def get_graph():
+    return registry.get("graph")
+
+
+def get_semantic_cache():
+    return registry.get("semantic_cache")
+
+
+def get_checkpointer():
+    return registry.get("checkpointer")
+
+
+def reload_index():
+    """디스크의 인덱스를 다시 읽어 리트리버와 그래프를 교체 (임베딩 모델과 대화 기록은 유지)"""
+    return registry.reload("retriever")
+
+
+def _reload_in_background():
+    try:
+        reload_index()
+    except Exception as e:
+        print(f"Index reload failed: {e!r}")
+
+
+def reload_index_if_changed():
+    """
+    인덱스 파일이 마지막 로드 이후 바뀌었으면 백그라운드 스레드에서 다시 로드하고 True 반환
+    (로드가 끝날 때까지는 기존 리트리버와 그래프를 그대로 사용)
+    """
+    global _reload_thread
+    # 리트리버를 아직 로드 중이면 (warm-up) 확인할 필요 없음
+    if not registry.is_loaded("retriever"):
+        return False
+    from index_tools import index_path
+
+    with _reload_lock:
+        if _reload_thread is not None and _reload_thread.is_alive():
+            return False
+        if index_signature(index_path(DB_INDEX, INDEX_TYPE)) == _index_signature:
+            return False
+        _reload_thread = threading.Thread(target=_reload_in_background, name="index-reload", daemon=True)
+        _reload_thread.start()
+        return True
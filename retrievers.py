@@ -1,22 +1,385 @@
-import streamlit as st
-from langchain.retrievers import ContextualCompressionRetriever
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+import numpy as np
+#from langchain.retrievers import ContextualCompressionRetriever
 #from langchain_community.document_compressors import JinaRerank
-from langchain.retrievers.document_compressors import FlashrankRerank
 #from langchain_openai import OpenAIEmbeddings
-from langchain_huggingface import HuggingFaceEmbeddings
 
-from langchain_community.vectorstores.faiss import FAISS
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+from docstore import SQLiteDocstore, docstore_path, publish_docstore
+from metrics import FAST_DURATION_BUCKETS, registry
+from sparse_index import LazyBM25Index, sparse_index_path
+
+# dense / sparse 검색을 병렬로 실행하기 위한 공유 스레드 풀
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
+RERANK_MODEL_NAME = "ms-marco-MiniLM-L-12-v2"
+
+
+class RetrievalTimings:
+    """검색 단계(first stage: dense/hybrid, rerank)별 소요 시간 집계"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._counts = {}
+        self.last = {}
+
+    def record(self, phase, seconds):
+        with self._lock:
+            self._totals[phase] = self._totals.get(phase, 0.0) + seconds
+            self._counts[phase] = self._counts.get(phase, 0) + 1
+            self.last[phase] = seconds
+        registry.observe(
+            "retrieval_phase_duration_seconds",
+            seconds,
+            buckets=FAST_DURATION_BUCKETS,
+            help="Retrieval phase wall time (first_stage: dense/hybrid, rerank)",
+            phase=phase,
+        )
+
+    def summary(self):
+        with self._lock:
+            return {
+                phase: {
+                    "count": self._counts[phase],
+                    "mean_ms": self._totals[phase] * 1000 / self._counts[phase],
+                    "last_ms": self.last[phase] * 1000,
+                }
+                for phase in self._totals
+            }
+
+
+retrieval_timings = RetrievalTimings()
+
+
+class CachedReranker:
+    """
+    Flashrank cross-encoder 점수를 (query, 문서) 단위로 캐시하는 reranker
+
+    캐시에 없는 문서만 batch_size 단위로 모아 점수를 계산하고, LRU 로 max_size 개까지 보관합니다.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL_NAME, max_size=4096, batch_size=32):
+        from flashrank import Ranker
+
+        self.ranker = Ranker(model_name=model_name)
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _doc_key(doc):
+        if doc.id:
+            return doc.id
+        return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+    def score(self, query, documents):
+        from flashrank import RerankRequest
+
+        keys = [(query, self._doc_key(doc)) for doc in documents]
+        scores = {}
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[key] = self._cache[key]
+            self.hits += len(scores)
+            self.misses += len(keys) - len(scores)
+
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start : start + self.batch_size]
+            request = RerankRequest(
+                query=query,
+                passages=[{"id": i, "text": documents[i].page_content} for i in batch],
+            )
+            for result in self.ranker.rerank(request):
+                scores[keys[result["id"]]] = float(result["score"])
+
+        with self._lock:
+            for i in missing:
+                self._cache[keys[i]] = scores[keys[i]]
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return [scores[key] for key in keys]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class ScoredVectorRetriever(BaseRetriever):
+    """FAISS 검색 결과에 거리 점수(metadata["dense_score"], 작을수록 유사)를 포함해 반환"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any  # langchain_community FAISS
+    k: int = 30
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        documents = []
+        for doc, score in self.vectorstore.similarity_search_with_score(query, k=self.k):
+            # docstore 의 Document 를 직접 수정하지 않도록 복사
+            documents.append(
+                Document(
+                    id=doc.id,
+                    page_content=doc.page_content,
+                    metadata={**doc.metadata, "dense_score": float(score)},
+                )
+            )
+        return documents
+
+
+class RerankRetriever(BaseRetriever):
+    """
+    first stage retriever 의 후보를 CachedReranker 로 재정렬해 상위 top_n 개를 반환
+
+    adaptive_rerank=True 이면 dense 거리가 1등과 adaptive_margin 이상 벌어진 후보는 rerank 하지 않아
+    (최소 min_candidates 개는 유지) 점수가 확실히 갈리는 질의의 rerank 비용을 줄입니다.
+    dense 검색은 항상 fetch_k 개를 가져오며, 줄어드는 것은 reranker 에 넘기는 후보 수뿐입니다.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    base_retriever: BaseRetriever
+    reranker: Any
+    top_n: int = 3
+    adaptive_rerank: bool = False
+    adaptive_margin: float = 0.25
+    min_candidates: int = 8
+
+    def _select_candidates(self, documents):
+        if not self.adaptive_rerank or len(documents) <= self.min_candidates:
+            return documents
+        distances = [doc.metadata.get("dense_score") for doc in documents]
+        if any(d is None for d in distances):
+            return documents
+        limit = distances[0] + self.adaptive_margin
+        keep = max(self.min_candidates, sum(1 for d in distances if d <= limit))
+        return documents[:keep]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        started = time.perf_counter()
+        candidates = self.base_retriever.invoke(
+            query, config={"callbacks": run_manager.get_child()}
+        )
+        candidates = self._select_candidates(candidates)
+        first_stage = time.perf_counter()
+        retrieval_timings.record("first_stage", first_stage - started)
 
+        scores = self.reranker.score(query, candidates)
+        retrieval_timings.record("rerank", time.perf_counter() - first_stage)
 
-def init_retriever(db_index="LANGCHAIN_DB_INDEX", fetch_k=30, top_n=8):
-    # Embeddings 설정
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        ranked = sorted(zip(candidates, scores), key=lambda pair: pair[1], reverse=True)
+        documents = []
+        for doc, score in ranked[: self.top_n]:
+            documents.append(
+                Document(
+                    id=doc.id,
+                    page_content=doc.page_content,
+                    metadata={**doc.metadata, "relevance_score": score},
+                )
+            )
+        return documents
+
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def init_embeddings(model_name=EMBEDDING_MODEL_NAME):
+    # Embeddings 설정 (torch 를 불러오므로 처음 사용할 때 import)
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def load_vectorstore(db_index, embeddings, index_type="flat", mmap=False, docstore="auto", readonly=True):
+    """
+    저장된 FAISS DB 로드
+
+    Args:
+        index_type: "flat"(정확한 brute force), "hnsw", "ivfpq" (index_tools.py convert 로 생성)
+        mmap: 인덱스 파일을 메모리 맵으로 읽어 여러 프로세스가 공유
+        docstore: "pickle"(index.pkl), "sqlite"(docstore.py 로 변환한 docstore.sqlite),
+            "auto"(docstore.sqlite 가 있으면 사용)
+    """
+    from langchain_community.vectorstores.faiss import FAISS
+    from index_tools import apply_search_params, index_path, read_faiss_index
+
+    path = index_path(db_index, index_type)
+    if docstore == "auto":
+        docstore = "sqlite" if os.path.exists(docstore_path(path)) else "pickle"
+
+    if docstore == "sqlite":
+        # 문서 내용은 검색된 id 만 필요할 때 읽음 (index.pkl 을 unpickle 하지 않음)
+        index = read_faiss_index(os.path.join(path, "index.faiss"), mmap=mmap)
+        sqlite_docstore = SQLiteDocstore(docstore_path(path), readonly=readonly)
+        vectorstore = FAISS(
+            embeddings, index, sqlite_docstore, sqlite_docstore.load_id_map()
+        )
+    elif mmap:
+        index = read_faiss_index(os.path.join(path, "index.faiss"), mmap=True)
+        with open(os.path.join(path, "index.pkl"), "rb") as f:
+            pickled_docstore, index_to_docstore_id = pickle.load(f)
+        vectorstore = FAISS(embeddings, index, pickled_docstore, index_to_docstore_id)
+    else:
+        vectorstore = FAISS.load_local(
+            path, embeddings, allow_dangerous_deserialization=True
+        )
+    apply_search_params(vectorstore.index)
+    return vectorstore
+
+
+def save_vectorstore(vectorstore, db_index):
+    from index_tools import write_faiss_index
+
+    if isinstance(vectorstore.docstore, SQLiteDocstore):
+        # 문서는 add/delete 시점에 이미 기록되었으므로 인덱스와 id 매핑만 저장
+        index_file = os.path.join(db_index, "index.faiss")
+        write_faiss_index(vectorstore.index, index_file + ".tmp")
+        vectorstore.docstore.save_id_map(vectorstore.index_to_docstore_id)
+        # stage_docstore 로 준비한 docstore 는 인덱스와 함께 교체
+        target = docstore_path(db_index)
+        if os.path.abspath(vectorstore.docstore.path) != os.path.abspath(target):
+            publish_docstore(vectorstore.docstore, target)
+        os.replace(index_file + ".tmp", index_file)
+    else:
+        vectorstore.save_local(db_index)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    BM25(sparse) 와 dense 검색을 병렬로 실행하고 Reciprocal Rank Fusion 으로 합치는 retriever
+
+    두 검색 모두 docstore id 를 반환하므로 같은 문서는 하나로 합쳐집니다.
+    RRF 점수: sum(weight / (rrf_k + rank))
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any  # langchain_community FAISS
+    sparse_index: Any
+    k: int = 30
+    dense_weight: float = 1.0
+    sparse_weight: float = 1.0
+    rrf_k: int = 60
+
+    def _dense_search(self, query):
+        vector = np.array([self.vectorstore._embed_query(query)], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            vector /= np.linalg.norm(vector, axis=1, keepdims=True)
+        _, positions = self.vectorstore.index.search(vector, self.k)
+        return [
+            self.vectorstore.index_to_docstore_id[int(p)]
+            for p in positions[0]
+            if p != -1
+        ]
+
+    def _sparse_search(self, query):
+        return [doc_id for doc_id, _ in self.sparse_index.search(query, self.k)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense = _search_executor.submit(self._dense_search, query)
+        sparse = _search_executor.submit(self._sparse_search, query)
+
+        fused = {}
+        for ranking, weight in ((dense.result(), self.dense_weight), (sparse.result(), self.sparse_weight)):
+            for rank, doc_id in enumerate(ranking, start=1):
+                fused[doc_id] = fused.get(doc_id, 0.0) + weight / (self.rrf_k + rank)
+
+        documents = []
+        for doc_id in sorted(fused, key=fused.get, reverse=True):
+            if len(documents) >= self.k:
+                break
+            doc = self.vectorstore.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                # BM25 인덱스가 docstore 보다 오래되어 삭제된 id 를 반환한 경우 (docstore 는 오류 문자열을 반환)
+                print(f"Hybrid search skipped missing document: {doc_id}")
+                continue
+            documents.append(
+                Document(
+                    id=doc_id,
+                    page_content=doc.page_content,
+                    metadata={**doc.metadata, "fusion_score": fused[doc_id]},
+                )
+            )
+        return documents
+
+
+def init_reranker(model_name=RERANK_MODEL_NAME, cache_size=4096):
+    return CachedReranker(model_name=model_name, max_size=cache_size)
+
+
+def init_retriever(
+    db_index="LANGCHAIN_DB_INDEX",
+    fetch_k=30,
+    top_n=3,
+    embeddings=None,
+    index_type="flat",
+    mmap=False,
+    report_recall=False,
+    mode="dense",
+    dense_weight=1.0,
+    sparse_weight=1.0,
+    reranker=None,
+    adaptive_rerank=False,
+):
+    """
+    Args:
+        mode: "dense"(FAISS 검색만) 또는 "hybrid"(BM25 + dense, RRF 로 결합).
+            hybrid 모드는 sparse_index.py 로 미리 만든 bm25.npz 가 필요하며 첫 검색 시 로드됩니다.
+            (bm25.npz 가 없으면 경고를 출력하고 dense 모드로 동작)
+        dense_weight, sparse_weight: hybrid 모드의 RRF 가중치
+        reranker: 공유할 CachedReranker (없으면 새로 생성)
+        adaptive_rerank: dense 점수가 확실히 갈리면 reranker 에 넘기는 후보 수를 줄임
+            (fetch_k 개를 가져오는 dense 검색은 그대로이며, dense 모드에서만 동작)
+    """
+    from index_tools import index_path, recall_at_k
+
+    # Embeddings 설정 (공유 임베딩 모델이 주어지면 재사용)
+    if embeddings is None:
+        embeddings = init_embeddings()
     # 저장된 DB 로드
-    langgraph_db = FAISS.load_local(
-        db_index, embeddings, allow_dangerous_deserialization=True
-    )
+    langgraph_db = load_vectorstore(db_index, embeddings, index_type=index_type, mmap=mmap)
+    if report_recall and index_type != "flat":
+        # 근사 인덱스 사용 시 정확한 flat 인덱스 대비 recall 을 출력
+        print(recall_at_k(db_index, index_type, k=fetch_k, mmap=mmap))
     # retriever 생성
-    code_retriever = langgraph_db.as_retriever(search_kwargs={"k": fetch_k})
+    bm25_path = sparse_index_path(index_path(db_index, index_type))
+    if mode == "hybrid" and not os.path.exists(bm25_path):
+        # 첫 질문의 검색 스레드에서 FileNotFoundError 가 나지 않도록 로드 시점에 확인
+        print(f"BM25 index not found at {bm25_path}, falling back to dense retrieval (build it with sparse_index.py)")
+        mode = "dense"
+    if mode == "hybrid":
+        code_retriever = HybridRetriever(
+            vectorstore=langgraph_db,
+            sparse_index=LazyBM25Index(bm25_path),
+            k=fetch_k,
+            dense_weight=dense_weight,
+            sparse_weight=sparse_weight,
+        )
+    else:
+        code_retriever = ScoredVectorRetriever(vectorstore=langgraph_db, k=fetch_k)
 
     '''
     # JinaRerank 설정
@@ -26,12 +389,14 @@ def init_retriever(db_index="LANGCHAIN_DB_INDEX", fetch_k=30, top_n=8):
     )
     '''
 
-    compressor = FlashrankRerank(model="ms-marco-MiniLM-L-12-v2", top_n=3)
-    compression_retriever = ContextualCompressionRetriever(
-        base_compressor=compressor,
-        base_retriever=code_retriever
+    # Flashrank 로 상위 top_n 개 재정렬 (cross-encoder 점수는 캐시)
+    if reranker is None:
+        reranker = init_reranker()
+    rerank_retriever = RerankRetriever(
+        base_retriever=code_retriever,
+        reranker=reranker,
+        top_n=top_n,
+        adaptive_rerank=adaptive_rerank,
     )
 
-
-
-    return compression_retriever
+    return rerank_retriever
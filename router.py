@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import random
+import threading
+
+import numpy as np
+
+from metrics import registry
+
+
+ROUTER_LOG_FILE = os.environ.get("ROUTER_LOG_FILE", "router_decisions.jsonl")
+ROUTER_CENTROIDS_FILE = os.environ.get("ROUTER_CENTROIDS_FILE", "router_centroids.npz")
+
+VECTORSTORE_ROUTE = "query_expansion"
+GENERAL_ROUTE = "general_answer"
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class RouterStats:
+    """로컬 라우터의 LLM fallback 비율과 (shadow 비교 시) LLM 과의 일치율"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.total = 0
+            self.local = 0
+            self.fallback = 0
+            self.shadow = 0
+            self.agree = 0
+
+    def record(self, local, shadow=False, agree=False):
+        with self._lock:
+            self.total += 1
+            if local:
+                self.local += 1
+            else:
+                self.fallback += 1
+            if shadow:
+                self.shadow += 1
+                self.agree += int(agree)
+        registry.inc(
+            "router_decisions_total",
+            help="Question routing decisions (local router or LLM fallback)",
+            decision="local" if local else "fallback",
+        )
+        if shadow:
+            registry.inc(
+                "router_shadow_comparisons_total",
+                help="Local router decisions compared against the LLM router",
+                agree=str(bool(agree)).lower(),
+            )
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "total": self.total,
+                "local": self.local,
+                "fallback": self.fallback,
+                "fallback_rate": self.fallback / self.total if self.total else 0.0,
+                "shadow_comparisons": self.shadow,
+                "agreement": self.agree / self.shadow if self.shadow else None,
+            }
+
+
+router_stats = RouterStats()
+
+
+class LocalRouter:
+    """
+    MiniLM 임베딩으로 질문을 분류하는 로컬 라우터
+
+    centroid 파일(router.py train 으로 생성)이 있으면 두 경로의 centroid 와의 유사도 차이로,
+    없으면 FAISS 인덱스에서 가장 가까운 chunk 와의 코사인 유사도로 판단합니다.
+    확신이 없는 구간(uncertain band)이면 None 을 반환하여 LLM 라우터를 사용하게 합니다.
+    """
+
+    def __init__(
+        self,
+        vectorstore,
+        high=0.5,
+        low=0.25,
+        centroid_margin=0.05,
+        centroids_path=ROUTER_CENTROIDS_FILE,
+        log_path=ROUTER_LOG_FILE,
+        shadow_rate=0.0,
+    ):
+        self.vectorstore = vectorstore
+        self.high = high
+        self.low = low
+        self.centroid_margin = centroid_margin
+        self.log_path = log_path
+        self.shadow_rate = shadow_rate
+        self.centroids = None
+        if centroids_path and os.path.exists(centroids_path):
+            with np.load(centroids_path) as data:
+                self.centroids = (data["vectorstore"], data["general"])
+        self._log_lock = threading.Lock()
+
+    def embed(self, question):
+        return _normalize(self.vectorstore._embed_query(question))
+
+    def nearest_similarity(self, vector):
+        distances, _ = self.vectorstore.index.search(vector[np.newaxis, :], 1)
+        # 정규화된 벡터의 L2 제곱 거리 d 와 코사인 유사도의 관계: cos = 1 - d / 2
+        return float(1 - distances[0][0] / 2)
+
+    def decide(self, question):
+        """(경로 또는 None, 점수)"""
+        vector = self.embed(question)
+        if self.centroids is not None:
+            yes, no = self.centroids
+            score = float(vector @ yes - vector @ no)
+            if score >= self.centroid_margin:
+                return VECTORSTORE_ROUTE, score
+            if score <= -self.centroid_margin:
+                return GENERAL_ROUTE, score
+            return None, score
+
+        score = self.nearest_similarity(vector)
+        if score >= self.high:
+            return VECTORSTORE_ROUTE, score
+        if score <= self.low:
+            return GENERAL_ROUTE, score
+        return None, score
+
+    def should_shadow(self):
+        return self.shadow_rate > 0 and random.random() < self.shadow_rate
+
+    def log_decision(self, question, route, score):
+        """LLM 라우터 결정을 기록 (centroid 학습 데이터)"""
+        if not self.log_path:
+            return
+        with self._log_lock, open(self.log_path, "a", encoding="utf-8") as file:
+            file.write(
+                json.dumps({"question": question, "route": route, "score": score}, ensure_ascii=False)
+                + "\n"
+            )
+
+
+def train_centroids(log_path, embeddings, out_path=ROUTER_CENTROIDS_FILE):
+    """기록된 LLM 라우터 결정으로 경로별 centroid 를 계산해 저장"""
+    questions = {VECTORSTORE_ROUTE: [], GENERAL_ROUTE: []}
+    with open(log_path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                questions.setdefault(record["route"], []).append(record["question"])
+
+    centroids = {}
+    for route, name in ((VECTORSTORE_ROUTE, "vectorstore"), (GENERAL_ROUTE, "general")):
+        if not questions[route]:
+            raise ValueError(f"No logged decisions for route: {route}")
+        vectors = np.array(
+            [_normalize(v) for v in embeddings.embed_documents(questions[route])]
+        )
+        centroids[name] = _normalize(vectors.mean(axis=0))
+    np.savez(out_path, **centroids)
+    return {route: len(items) for route, items in questions.items()}
+
+
+def main():
+    from retrievers import init_embeddings
+
+    parser = argparse.ArgumentParser(description="LLM 라우터 결정 로그로 로컬 라우터 centroid 학습")
+    parser.add_argument("--log", default=ROUTER_LOG_FILE)
+    parser.add_argument("--out", default=ROUTER_CENTROIDS_FILE)
+    args = parser.parse_args()
+
+    counts = train_centroids(args.log, init_embeddings(), args.out)
+    print(f"Trained router centroids from {counts} -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    질문 임베딩 유사도 기반 답변 캐시
+
+    과거 질문들의 (정규화된) 임베딩을 작은 메모리 행렬로 보관하고, 새 질문과의
+    코사인 유사도가 threshold 이상이면 저장된 답변(generation)을 돌려줍니다.
+    LRU + TTL 로 항목을 제거하며 최대 max_size 개까지만 보관합니다.
+    """
+
+    def __init__(self, embeddings, threshold=0.92, max_size=512, ttl=60 * 60 * 24):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (question, generation, created_at)
+        self._entries = OrderedDict()
+        self._keys = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._next_key = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, question):
+        """유사한 과거 질문의 답변을 반환 (없으면 None)"""
+        vector = self._embed(question)
+        with self._lock:
+            self._evict_expired()
+            if self._keys:
+                similarities = self._vectors @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key = self._keys[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][1]
+            self.misses += 1
+            return None
+
+    def store(self, question, generation):
+        vector = self._embed(question)
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = (question, generation, time.monotonic())
+            self._keys.append(key)
+            if self._vectors.size == 0:
+                self._vectors = vector[np.newaxis, :]
+            else:
+                self._vectors = np.vstack([self._vectors, vector])
+            while len(self._entries) > self.max_size:
+                oldest, _ = self._entries.popitem(last=False)
+                self._remove_vector(oldest)
+
+    def clear(self):
+        """문서 인덱스가 다시 만들어지면 저장된 답변이 더 이상 유효하지 않으므로 모두 제거"""
+        with self._lock:
+            self._entries.clear()
+            self._keys = []
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def _evict_expired(self):
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        # OrderedDict 는 최근 사용 순서이므로 생성 시각 기준으로 전체를 확인
+        expired = [
+            key
+            for key, (_, _, created_at) in self._entries.items()
+            if now - created_at > self.ttl
+        ]
+        for key in expired:
+            del self._entries[key]
+            self._remove_vector(key)
+
+    def _remove_vector(self, key):
+        index = self._keys.index(key)
+        del self._keys[index]
+        self._vectors = np.delete(self._vectors, index, axis=0)
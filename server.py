@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import json
+import os
+from uuid import uuid4
+
+import tornado.web
+from dotenv import load_dotenv
+from tornado.iostream import StreamClosedError
+
+import metrics
+from feedback import get_feedback_queue
+from llm_cache import cache_stats
+from resources import get_graph, get_semantic_cache
+from router import router_stats
+from startup import is_ready, readiness, start_warmup
+from streamlit_wrapper import astream_graph
+from tools import normalize_query, web_search_cache_stats
+from tracing import TRACING_MODE, configure_tracing
+
+
+class Overloaded(Exception):
+    pass
+
+
+class ThreadBusy(Exception):
+    pass
+
+
+class GraphRun:
+    """그래프 실행 하나의 이벤트(astream_graph)를 기록해 두고 여러 요청에 전달"""
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        # LangSmith 피드백을 연결할 최상위 run id
+        self.run_id = str(uuid4())
+        self.events = []
+        self.done = False
+        self.task = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event):
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def close(self):
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def subscribe(self):
+        # 늦게 합류한 요청도 처음 이벤트부터 받음
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.events) or self.done)
+                events = self.events[index:]
+                index = len(self.events)
+                finished = self.done
+            for event in events:
+                yield event
+            if finished:
+                return
+
+
+class GraphService:
+    """
+    그래프 실행 관리
+
+    - 같은 질문(같은 thread_id, 또는 둘 다 thread_id 없음)이 동시에 들어오면 한 번만 실행하고 결과를 공유
+    - 같은 thread_id 로 다른 질문이 실행 중이면 거절 (같은 체크포인트에 두 실행이 동시에 기록하지 않도록)
+    - 동시에 실행하는 그래프 수는 max_concurrency 로 제한하고, 대기 중인 실행까지 max_pending 을 넘으면 거절
+    """
+
+    def __init__(self, max_concurrency=16, max_pending=64):
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._runs = {}
+        # thread_id -> 실행 중인 run 의 key
+        self._threads = {}
+        self.pending = 0
+        self.coalesced = 0
+
+    def start(self, question, thread_id=None):
+        key = (normalize_query(question), thread_id)
+        run = self._runs.get(key)
+        if run is not None:
+            self.coalesced += 1
+            if metrics.METRICS_ENABLED:
+                metrics.registry.inc("server_coalesced_total", help="Requests served by an in-flight graph run")
+            return run
+        if thread_id is not None and thread_id in self._threads:
+            raise ThreadBusy()
+        if self.pending >= self.max_pending:
+            raise Overloaded()
+
+        run = GraphRun(thread_id or str(uuid4()))
+        self._runs[key] = run
+        if thread_id is not None:
+            self._threads[thread_id] = key
+        self.pending += 1
+        run.task = asyncio.create_task(self._execute(key, run, question))
+        return run
+
+    async def _execute(self, key, run, question):
+        try:
+            async with self._semaphore:
+                async for event in astream_graph(
+                    get_graph(), question, run.thread_id, cache=get_semantic_cache(), run_id=run.run_id
+                ):
+                    await run.publish(event)
+        except Exception as e:
+            await run.publish({"type": "error", "error": f"{type(e).__name__}: {e}"})
+        finally:
+            self._runs.pop(key, None)
+            if self._threads.get(key[1]) == key:
+                del self._threads[key[1]]
+            self.pending -= 1
+            await run.close()
+
+    def stats(self):
+        return {"pending": self.pending, "in_flight": len(self._runs), "coalesced": self.coalesced}
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def write_json(self, data, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json; charset=utf-8")
+        self.finish(json.dumps(data, ensure_ascii=False, default=str))
+
+    def params(self):
+        if self.request.body:
+            try:
+                return json.loads(self.request.body)
+            except json.JSONDecodeError:
+                raise tornado.web.HTTPError(400, "invalid JSON body")
+        return {key: self.get_argument(key) for key in self.request.arguments}
+
+    def start_run(self):
+        """요청 파라미터로 그래프 실행을 시작(또는 합류). 거절한 경우 응답을 보내고 None 반환"""
+        params = self.params()
+        question = (params.get("question") or "").strip()
+        if not question:
+            self.write_json({"error": "question is required"}, status=400)
+            return None
+        if not is_ready():
+            self.set_header("Retry-After", "5")
+            self.write_json({"error": "not ready"}, status=503)
+            return None
+        try:
+            return self.service.start(question, params.get("thread_id") or None)
+        except ThreadBusy:
+            self.set_header("Retry-After", "1")
+            self.write_json({"error": "another question is running on this thread"}, status=409)
+            return None
+        except Overloaded:
+            self.set_header("Retry-After", "1")
+            self.write_json({"error": "too many pending requests"}, status=503)
+            return None
+
+
+class AskHandler(BaseHandler):
+    """POST /ask {"question": ..., "thread_id": 선택} -> 최종 답변"""
+
+    async def post(self):
+        run = self.start_run()
+        if run is None:
+            return
+        nodes = []
+        async for event in run.subscribe():
+            if event["type"] == "node":
+                nodes.append(event["node"])
+            elif event["type"] == "error":
+                self.write_json({"thread_id": run.thread_id, "error": event["error"]}, status=500)
+                return
+            elif event["type"] == "done":
+                self.write_json(
+                    {
+                        "thread_id": run.thread_id,
+                        "run_id": run.run_id,
+                        "generation": event["state"].get("generation", ""),
+                        "nodes": nodes,
+                        "cached": event["cached"],
+                        "budget_exhausted": event["state"].get("budget_exhausted", ""),
+                    }
+                )
+                return
+
+
+class StreamHandler(BaseHandler):
+    """GET/POST /stream -> 노드 진행 상황과 답변 토큰을 Server-Sent Events 로 전달"""
+
+    async def get(self):
+        run = self.start_run()
+        if run is None:
+            return
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("X-Accel-Buffering", "no")
+        try:
+            await self.send("thread", {"thread_id": run.thread_id, "run_id": run.run_id})
+            async for event in run.subscribe():
+                await self.send(event["type"], event)
+        except StreamClosedError:
+            # 클라이언트가 연결을 끊어도 그래프 실행은 다른 요청을 위해 계속됨
+            return
+        self.finish()
+
+    async def post(self):
+        await self.get()
+
+    async def send(self, name, data):
+        self.write(f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n")
+        # 느린 클라이언트에는 소켓 버퍼가 비워질 때까지 기다려 메모리에 쌓이지 않도록 함
+        await self.flush()
+
+
+class ThreadHandler(BaseHandler):
+    """GET /threads/<thread_id> -> 체크포인터에 저장된 마지막 상태"""
+
+    async def get(self, thread_id):
+        if not is_ready():
+            self.write_json({"error": "not ready"}, status=503)
+            return
+        snapshot = await get_graph().aget_state({"configurable": {"thread_id": thread_id}})
+        if not snapshot.values:
+            self.write_json({"error": "unknown thread"}, status=404)
+            return
+        self.write_json({"thread_id": thread_id, "values": snapshot.values, "next": list(snapshot.next)})
+
+
+class FeedbackHandler(BaseHandler):
+    """POST /feedback {"run_id": ..., "key": ..., "score" 또는 "comment"} -> 대기열에 넣고 바로 202 반환"""
+
+    def post(self):
+        params = self.params()
+        if not params.get("run_id") or not params.get("key"):
+            self.write_json({"error": "run_id and key are required"}, status=400)
+            return
+        # sampled 추적에서 trace 가 전송되지 않은 run 이면 queued=False
+        queued = get_feedback_queue().enqueue(
+            params["run_id"], params["key"], score=params.get("score"), comment=params.get("comment")
+        )
+        self.write_json({"queued": queued}, status=202)
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write_json(
+            {
+                "status": "ok",
+                **self.service.stats(),
+                "llm_cache": cache_stats(),
+                "router": router_stats.snapshot(),
+                "web_search_cache": web_search_cache_stats(),
+            }
+        )
+
+
+class ReadyHandler(BaseHandler):
+    def get(self):
+        state = readiness()
+        self.write_json(state, status=200 if state["ready"] else 503)
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.finish(metrics.to_prometheus())
+
+
+def make_app(service):
+    args = {"service": service}
+    return tornado.web.Application(
+        [
+            (r"/ask", AskHandler, args),
+            (r"/stream", StreamHandler, args),
+            (r"/threads/([^/]+)", ThreadHandler, args),
+            (r"/feedback", FeedbackHandler, args),
+            (r"/healthz", HealthHandler, args),
+            (r"/readyz", ReadyHandler, args),
+            (r"/metrics", MetricsHandler, args),
+        ]
+    )
+
+
+async def serve(host, port, max_concurrency, max_pending):
+    service = GraphService(max_concurrency=max_concurrency, max_pending=max_pending)
+    make_app(service).listen(port, address=host)
+    print(f"Listening on http://{host}:{port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 없이 그래프를 제공하는 HTTP API 서버")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrency", type=int, default=16, help="동시에 실행할 그래프 수")
+    parser.add_argument("--max-pending", type=int, default=64, help="실행 대기까지 포함한 최대 요청 수 (넘으면 503)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # "full" 은 .env 의 LangSmith 설정을 그대로 사용
+    if TRACING_MODE != "full":
+        configure_tracing(TRACING_MODE, os.environ.get("LANGSMITH_PROJECT"))
+    # 모델/인덱스 로드가 끝나기 전에는 /readyz 가 503 을 반환
+    start_warmup()
+    asyncio.run(serve(args.host, args.port, args.max_concurrency, args.max_pending))
+
+
+if __name__ == "__main__":
+    main()
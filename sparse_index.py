@@ -0,0 +1,179 @@
+import argparse
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+
+SPARSE_INDEX_FILE = "bm25.npz"
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+|[가-힣]+")
+CAMEL_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def tokenize(text):
+    """
+    코드 검색용 토큰화. 식별자는 전체(소문자)와 함께 snake_case / CamelCase 조각으로도 색인합니다.
+    (예: "StateGraph.add_node" -> stategraph, state, graph, add_node, add, node)
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text):
+        lowered = token.lower()
+        tokens.append(lowered)
+        parts = [p.lower() for piece in token.split("_") for p in CAMEL_PATTERN.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    CSR 형태의 역색인으로 저장된 BM25 인덱스
+
+    용어별 posting(문서 번호, 빈도)을 하나의 연속 배열에 담아 메모리를 적게 사용합니다.
+    """
+
+    def __init__(self, terms, offsets, postings, tfs, doc_lengths, doc_ids, k1=1.5, b=0.75):
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.doc_ids = doc_ids
+        self.k1 = k1
+        self.b = b
+        n_docs = len(doc_lengths)
+        df = np.diff(offsets).astype(np.float32)
+        self.idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_length = doc_lengths.mean() if n_docs else 0.0
+        # 문서 길이 정규화 항은 질의와 무관하므로 미리 계산
+        self.length_norm = (k1 * (1 - b + b * doc_lengths / max(avg_length, 1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, documents, **kwargs):
+        """documents: (doc_id, text) 목록"""
+        term_postings = {}
+        doc_ids = []
+        doc_lengths = []
+        for doc_index, (doc_id, text) in enumerate(documents):
+            tokens = tokenize(text)
+            doc_ids.append(doc_id)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_postings.setdefault(term, []).append((doc_index, tf))
+
+        terms = sorted(term_postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(term_postings[term])
+        postings = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            entries = term_postings[term]
+            postings[offsets[i] : offsets[i + 1]] = [d for d, _ in entries]
+            tfs[offsets[i] : offsets[i + 1]] = [min(tf, 65535) for _, tf in entries]
+
+        return cls(
+            np.array(terms),
+            offsets,
+            postings,
+            tfs,
+            np.array(doc_lengths, dtype=np.float32),
+            np.array(doc_ids),
+            **kwargs,
+        )
+
+    def save(self, path):
+        terms = np.array(sorted(self.vocabulary, key=self.vocabulary.get))
+        np.savez_compressed(
+            path,
+            terms=terms,
+            offsets=self.offsets,
+            postings=self.postings,
+            tfs=self.tfs,
+            doc_lengths=self.doc_lengths,
+            doc_ids=self.doc_ids,
+        )
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with np.load(path) as data:
+            return cls(
+                data["terms"],
+                data["offsets"],
+                data["postings"],
+                data["tfs"],
+                data["doc_lengths"],
+                data["doc_ids"],
+                **kwargs,
+            )
+
+    def search(self, query, k=30):
+        """(doc_id, score) 목록을 점수 내림차순으로 반환"""
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_index = self.vocabulary.get(term)
+            if term_index is None:
+                continue
+            start, end = self.offsets[term_index], self.offsets[term_index + 1]
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            scores[docs] += self.idf[term_index] * tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(str(self.doc_ids[i]), float(scores[i])) for i in candidates]
+
+
+class LazyBM25Index:
+    """첫 검색 시점에 디스크에서 인덱스를 읽음"""
+
+    def __init__(self, path):
+        self.path = path
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = BM25Index.load(self.path)
+        return self._index
+
+    def search(self, query, k=30):
+        return self.get().search(query, k)
+
+
+def sparse_index_path(db_index):
+    return os.path.join(db_index, SPARSE_INDEX_FILE)
+
+
+def build_sparse_index(vectorstore, db_index):
+    """FAISS 벡터스토어의 docstore 와 같은 문서로 BM25 인덱스를 만들어 저장"""
+    documents = [
+        (doc_id, vectorstore.docstore.search(doc_id).page_content)
+        for doc_id in vectorstore.index_to_docstore_id.values()
+    ]
+    index = BM25Index.build(documents)
+    index.save(sparse_index_path(db_index))
+    return index
+
+
+def main():
+    from retrievers import init_embeddings, load_vectorstore
+
+    parser = argparse.ArgumentParser(description="docstore 로 BM25 역색인 생성")
+    parser.add_argument("--db-index", default="LANGCHAIN_DB_INDEX")
+    args = parser.parse_args()
+
+    vectorstore = load_vectorstore(args.db_index, init_embeddings())
+    index = build_sparse_index(vectorstore, args.db_index)
+    print(f"Built BM25 index: {len(index.doc_ids)} documents, {len(index.vocabulary)} terms")
+
+
+if __name__ == "__main__":
+    main()
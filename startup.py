@@ -0,0 +1,110 @@
+import importlib
+import threading
+import time
+
+from resources import registry
+
+
+# 첫 요청 전에 미리 불러올 무거운 모듈 (import 비용 측정용)
+HEAVY_MODULES = (
+    "langgraph.graph",
+    "langchain_anthropic",
+    "langchain_community.vectorstores.faiss",
+    "langchain_huggingface",
+    "flashrank",
+    "langchain_teddynote",
+)
+
+# 미리 생성할 공유 리소스 (resources.registry 이름)
+WARMUP_RESOURCES = ("embeddings", "reranker", "retriever", "graph")
+
+_lock = threading.Lock()
+_thread = None
+_ready = threading.Event()
+_state = {
+    "status": "idle",
+    "error": None,
+    "started_at": None,
+    "finished_at": None,
+    "imports": {},
+    "resources": {},
+}
+
+
+def _warmup(modules, resources):
+    _state["status"] = "loading"
+    _state["started_at"] = time.time()
+    try:
+        # 모듈은 한 번만 import 되므로, 먼저 import 된 모듈이 공통 의존성의 비용까지 포함함
+        for module in modules:
+            started = time.perf_counter()
+            importlib.import_module(module)
+            _state["imports"][module] = time.perf_counter() - started
+        for name in resources:
+            started = time.perf_counter()
+            registry.get(name)
+            _state["resources"][name] = time.perf_counter() - started
+        _state["status"] = "ready"
+    except Exception as e:
+        _state["status"] = "failed"
+        _state["error"] = repr(e)
+    finally:
+        _state["finished_at"] = time.time()
+        _ready.set()
+
+
+def start_warmup(modules=HEAVY_MODULES, resources=WARMUP_RESOURCES):
+    """백그라운드 스레드에서 무거운 모듈과 리소스를 미리 로드 (여러 번 호출해도 한 번만 실행)"""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_warmup, args=(modules, resources), name="warmup", daemon=True
+            )
+            _thread.start()
+    return _thread
+
+
+def is_ready():
+    return _state["status"] == "ready"
+
+
+def wait_until_ready(timeout=None):
+    """warm-up 이 끝날 때까지 대기. 준비되었으면 True"""
+    _ready.wait(timeout)
+    return is_ready()
+
+
+def readiness():
+    """readiness probe 응답: 상태와 로드된 리소스 목록"""
+    return {
+        "ready": is_ready(),
+        "status": _state["status"],
+        "error": _state["error"],
+        "loaded": [name for name in WARMUP_RESOURCES if registry.is_loaded(name)],
+    }
+
+
+def startup_report():
+    """import 와 모델/인덱스 로드 시간(초)의 내역"""
+    imports = dict(_state["imports"])
+    resources = dict(_state["resources"])
+    total = None
+    if _state["started_at"] and _state["finished_at"]:
+        total = _state["finished_at"] - _state["started_at"]
+    return {
+        "status": _state["status"],
+        "imports": imports,
+        "resources": resources,
+        "import_seconds": sum(imports.values()),
+        "resource_seconds": sum(resources.values()),
+        "total_seconds": total,
+    }
+
+
+if __name__ == "__main__":
+    import json
+
+    start_warmup()
+    wait_until_ready()
+    print(json.dumps(startup_report(), indent=2))
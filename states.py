@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from typing_extensions import TypedDict, Annotated
 
 
@@ -11,9 +11,25 @@ class GraphState(TypedDict):
         question: 질문
         generation: LLM 생성된 답변
         documents: 도큐먼트 리스트
+        document_scores: documents 와 같은 순서의 reranker 점수 (점수가 없으면 빈 리스트)
+        context: 답변 생성에 사용한 문맥 (중복 제거/토큰 예산 적용 후, groundedness 검사에서 재사용)
+        route: 질문 라우팅 결과 (speculative 모드에서 사용)
+        rewrite_count: 질문 재작성 횟수
+        deadline: 요청 제한 시각 (epoch 초)
+        llm_budget: 요청당 허용하는 LLM 호출 수
+        llm_calls: 지금까지 사용한 LLM 호출 수 (조건부 엣지의 호출은 미리 계산: 라우팅은 initial_state,
+            답변 검증은 RagAnswerNode)
+        budget_exhausted: 예산이 부족해 검증을 마치지 못하고 종료한 이유 ("deadline" / "llm_budget", 없으면 "")
     """
 
     question: Annotated[str, "User question"]
     generation: Annotated[str, "LLM generated answer"]
     documents: Annotated[List[str], "List of documents"]
+    document_scores: Annotated[List[Optional[float]], "Reranker scores of documents"]
     rewrite_count: Annotated[int, "Number of rewrites"]
+    context: Annotated[List[str], "Assembled context used for generation"]
+    route: Annotated[str, "Routing decision"]
+    deadline: Annotated[Optional[float], "Request deadline (epoch seconds)"]
+    llm_budget: Annotated[int, "Maximum LLM calls per request"]
+    llm_calls: Annotated[int, "LLM calls used so far"]
+    budget_exhausted: Annotated[str, "Reason the request stopped early"]
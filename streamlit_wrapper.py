@@ -1,20 +1,96 @@
-from langgraph.graph import END, StateGraph, START
-from langgraph.checkpoint.memory import MemorySaver
+import asyncio
+
 from langgraph.errors import GraphRecursionError
-from langchain_core.runnables import RunnableConfig
-from langchain_anthropic import ChatAnthropic
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from chains import create_llm
+import budget
+import metrics
+import tracing
 import streamlit as st
 from retrievers import init_retriever
 from states import GraphState
 from rag import create_rag_chain
+from context import ContextAssembler, DEFAULT_TOKEN_BUDGET
 from nodes import *
 
 
 DB_INDEX = "LANGCHAIN_DB_INDEX"
 
+# 토큰 단위로 화면에 스트리밍할 답변 생성 노드
+ANSWER_NODES = ("rag_answer", "general_answer")
+# 답변 검증에 실패했을 때 이동하는 노드. 이 노드가 시작되면 (debug 스트림의 task 이벤트) 화면의 답변을 지움
+ANSWER_RETRY_NODES = ("query_rewrite", "web_search")
+
+# 노드별 진행 상황 메시지
+NODE_ACTIONS = {
+    "retrieve": "🔍 문서를 조회하는 중입니다.",
+    "grade_documents": "👀 조회한 문서 중 중요한 내용을 추려내는 중입니다.",
+    "rag_answer": "🔥 문서를 기반으로 답변을 생성하는 중입니다.",
+    "general_answer": "🔥 문서를 기반으로 답변을 생성하는 중입니다.",
+    "web_search": "🛜 웹 검색을 진행하는 중입니다.",
+    "budget_exhausted": "⏱️ 요청 예산을 모두 사용해 지금까지의 답변을 정리하는 중입니다.",
+}
+
+
+def message_text(chunk) -> str:
+    """메시지 청크에서 텍스트만 추출 (구조화 출력의 tool_use 청크는 제외)"""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "")
+        for block in content
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+
+def is_retry_start(event) -> bool:
+    """debug 스트림 이벤트가 답변 재시도 노드(ANSWER_RETRY_NODES)의 시작인지 여부"""
+    return event.get("type") == "task" and event.get("payload", {}).get("name") in ANSWER_RETRY_NODES
 
-def create_graph():
-    retriever = init_retriever()
+
+def create_graph(
+    retriever=None,
+    checkpointer=None,
+    grading_concurrency=4,
+    grading_timeout=30,
+    grading_early_exit=False,
+    grading_score_filter=False,
+    context_token_budget=DEFAULT_TOKEN_BUDGET,
+    context_max_passage_tokens=800,
+    async_mode=False,
+    speculative=False,
+    speculative_retrieve=False,
+    router="llm",
+    router_kwargs=None,
+    vectorstore=None,
+):
+    """
+    Args:
+        grading_score_filter: reranker 점수로 확실한 문서는 LLM 평가 없이 판정
+            (임계값은 calibration.py 로 보정한 GRADER_CALIBRATION_FILE 사용)
+        context_token_budget: 답변 생성/groundedness 검사에 넣을 문맥의 토큰 예산 (None 이면 제한 없이 중복만 제거)
+        context_max_passage_tokens: 문서(긴 웹 페이지 등) 하나에 허용할 최대 토큰 수
+        async_mode: True 이면 각 노드를 동기/비동기 구현을 모두 가진 Runnable 로 감싸
+            app.stream 과 app.astream (astream_graph) 을 모두 지원하는 그래프를 생성
+        speculative: True 이면 라우팅과 질문 재작성을 동시에 실행하고,
+            답변 검증의 두 검사도 동시에 실행 (낭비된 작업은 speculation_stats 에 기록)
+        speculative_retrieve: speculative 모드에서 문서 검색까지 미리 실행
+        router: "llm"(항상 LLM 라우터) 또는 "local"(임베딩 기반 라우터, 불확실할 때만 LLM)
+        router_kwargs: local 라우터(router.LocalRouter) 설정 (high, low, shadow_rate 등)
+        vectorstore: local 라우터가 사용할 FAISS 벡터스토어 (없으면 retriever 에서 가져옴)
+    """
+
+    from langgraph.graph import END, StateGraph, START
+    from langgraph.checkpoint.memory import MemorySaver
+
+    def node(n):
+        if not async_mode:
+            return n
+        return RunnableLambda(n.__call__, afunc=n.acall, name=n.name)
+
+    if retriever is None:
+        retriever = init_retriever(DB_INDEX)
     # 문서 검색 체인 생성
     rag_chain = create_rag_chain()
 
@@ -22,27 +98,82 @@ def create_graph():
     workflow = StateGraph(GraphState)
 
     # 노드 정의
-    workflow.add_node("query_expand", QueryRewriteNode())  # 질문 재작성
-    workflow.add_node("query_rewrite", QueryRewriteNode())  # 질문 재작성
-    workflow.add_node("web_search", WebSearchNode())  # 웹 검색
-    workflow.add_node("retrieve", RetrieveNode(retriever))  # 문서 검색
-    workflow.add_node("grade_documents", FilteringDocumentsNode())  # 문서 평가
+    if not speculative:
+        workflow.add_node("query_expand", node(QueryRewriteNode()))  # 질문 재작성
+    workflow.add_node("query_rewrite", node(QueryRewriteNode()))  # 질문 재작성
+    workflow.add_node("web_search", node(WebSearchNode()))  # 웹 검색
+    workflow.add_node("retrieve", node(RetrieveNode(retriever)))  # 문서 검색
+    workflow.add_node(
+        "grade_documents",
+        node(
+            FilteringDocumentsNode(
+                concurrency=grading_concurrency,
+                timeout=grading_timeout,
+                early_exit=grading_early_exit,
+                score_filter=grading_score_filter,
+            )
+        ),
+    )  # 문서 평가
     workflow.add_node(
-        "general_answer", GeneralAnswerNode(ChatAnthropic(model="claude-3-7-sonnet-20250219", temperature=0))
+        "general_answer",
+        node(GeneralAnswerNode(create_llm("general_answer"))),
     )  # 일반 답변 생성
-    workflow.add_node("rag_answer", RagAnswerNode(rag_chain))  # RAG 답변 생성
+    workflow.add_node(
+        "rag_answer",
+        node(
+            RagAnswerNode(
+                rag_chain,
+                assembler=ContextAssembler(
+                    token_budget=context_token_budget,
+                    max_passage_tokens=context_max_passage_tokens,
+                ),
+            )
+        ),
+    )  # RAG 답변 생성
+    workflow.add_node("budget_exhausted", node(BudgetExhaustedNode()))  # 예산 소진
+
+    # 질문 라우터
+    if router == "local":
+        if vectorstore is None:
+            vectorstore = retriever.base_retriever.vectorstore
+        route_node = LocalRouteQuestionNode(vectorstore, **(router_kwargs or {}))
+    else:
+        route_node = RouteQuestionNode()
 
     # 엣지 추가
-    workflow.add_conditional_edges(
-        START,
-        RouteQuestionNode(),
-        {
-            "query_expansion": "query_expand",  # 웹 검색으로 라우팅
-            "general_answer": "general_answer",  # 벡터스토어로 라우팅
-        },
-    )
+    if speculative:
+        # 라우팅과 질문 재작성(및 문서 검색)을 한 노드에서 동시에 실행
+        workflow.add_node(
+            "route_and_expand",
+            node(
+                SpeculativeRouteNode(
+                    router=route_node,
+                    retriever=retriever if speculative_retrieve else None,
+                )
+            ),
+        )
+        workflow.add_edge(START, "route_and_expand")
+        workflow.add_conditional_edges(
+            "route_and_expand",
+            route_from_state,
+            {
+                "query_expansion": (
+                    "grade_documents" if speculative_retrieve else "retrieve"
+                ),
+                "general_answer": "general_answer",
+            },
+        )
+    else:
+        workflow.add_conditional_edges(
+            START,
+            node(route_node),
+            {
+                "query_expansion": "query_expand",  # 웹 검색으로 라우팅
+                "general_answer": "general_answer",  # 벡터스토어로 라우팅
+            },
+        )
+        workflow.add_edge("query_expand", "retrieve")
 
-    workflow.add_edge("query_expand", "retrieve")
     workflow.add_edge("retrieve", "grade_documents")
 
     workflow.add_conditional_edges(
@@ -58,64 +189,213 @@ def create_graph():
 
     workflow.add_conditional_edges(
         "rag_answer",
-        AnswerGroundednessCheckNode(),
+        node(AnswerGroundednessCheckNode(parallel=speculative)),
         {
             "relevant": END,
             "not relevant": "web_search",
             "not grounded": "query_rewrite",
+            "budget_exhausted": "budget_exhausted",
         },
     )
+    workflow.add_edge("budget_exhausted", END)
 
     workflow.add_edge("web_search", "rag_answer")
 
     # 그래프 컴파일
-    app = workflow.compile(checkpointer=MemorySaver())
+    if checkpointer is None:
+        checkpointer = MemorySaver()
+    app = workflow.compile(checkpointer=checkpointer)
     return app
 
 
-def stream_graph(
-    app,
-    query: str,
-    streamlit_container,
-    thread_id: str,
-):
-    config = RunnableConfig(recursion_limit=4, configurable={"thread_id": thread_id})
-
+def initial_state(query: str, deadline_seconds=None, llm_budget=None) -> GraphState:
+    """
+    Args:
+        deadline_seconds: 요청 제한 시간(초). 없으면 REQUEST_DEADLINE_SECONDS
+        llm_budget: 요청당 LLM 호출 수 한도. 없으면 REQUEST_LLM_BUDGET
+    """
     # AgentState 객체를 활용하여 질문을 입력합니다.
     '''
     inputs = GraphState(question=query)
     '''
-    inputs = GraphState(
+    return GraphState(
         question=query,
         generation="",
         documents=[],
-        rewrite_count=0  # 무한루프 방지를 위한 재귀 횟수
+        document_scores=[],
+        context=[],
+        rewrite_count=0,  # 무한루프 방지를 위한 재귀 횟수
+        route="",
+        **budget.new_budget(deadline_seconds, llm_budget),
     )
 
-    # app.stream을 통해 입력된 메시지에 대한 출력을 스트리밍합니다.
-    actions = {
-        "retrieve": "🔍 문서를 조회하는 중입니다.",
-        "grade_documents": "👀 조회한 문서 중 중요한 내용을 추려내는 중입니다.",
-        "rag_answer": "🔥 문서를 기반으로 답변을 생성하는 중입니다.",
-        "general_answer": "🔥 문서를 기반으로 답변을 생성하는 중입니다.",
-        "web_search": "🛜 웹 검색을 진행하는 중입니다.",
-    }
-
-    try:
-        # streamlit_container
-        with streamlit_container.status(
-            "😊 열심히 생각중 입니다...", expanded=True
-        ) as status:
-            st.write("🧑‍💻 질문의 의도를 분석하는 중입니다.")
-            for output in app.stream(inputs, config=config):
-                # 출력된 결과에서 키와 값을 순회합니다.
+
+def graph_config(thread_id: str, run_id=None, llm_budget=None) -> RunnableConfig:
+    """
+    Args:
+        llm_budget: initial_state 에 준 LLM 호출 한도. 답변/재시도 반복은 이 예산으로 제한하고,
+            recursion_limit 은 예산보다 넉넉하게 잡아 예상치 못한 반복을 막는 안전장치로만 사용
+    """
+    config = RunnableConfig(
+        recursion_limit=budget.recursion_limit(llm_budget),
+        configurable={"thread_id": thread_id},
+        callbacks=metrics.callbacks() + tracing.callbacks(),
+    )
+    # 최상위 run 의 id 를 지정해 두면 LangSmith 피드백을 정확한 trace 에 연결할 수 있음
+    if run_id is not None:
+        config["run_id"] = run_id
+    return config
+
+
+def _cache_hit_run(generation):
+    # 캐시에서 바로 답한 경우에도 run_id 로 실제 run 을 남겨 피드백이 존재하지 않는 run 에 연결되지 않도록 함
+    return RunnableLambda(lambda _: generation, name="semantic_cache_hit")
+
+
+def stream_graph(
+    app,
+    query: str,
+    streamlit_container,
+    thread_id: str,
+    cache=None,
+    answer_container=None,
+    run_id=None,
+):
+    # 의미적으로 같은 질문에 대한 검증된 답변이 있으면 그래프를 실행하지 않고 바로 반환
+    if cache is not None:
+        cached_generation = cache.lookup(query)
+        if cached_generation is not None:
+            _cache_hit_run(cached_generation).invoke(query, config=graph_config(thread_id, run_id))
+            streamlit_container.status("⚡ 이전 답변을 불러왔습니다.", state="complete")
+            if answer_container is not None:
+                answer_container.markdown(cached_generation)
+            return GraphState(
+                question=query,
+                generation=cached_generation,
+                documents=[],
+                rewrite_count=0,
+            )
+
+    config = graph_config(thread_id, run_id)
+    inputs = initial_state(query)
+
+    with metrics.request_trace(thread_id):
+        try:
+            # streamlit_container
+            with streamlit_container.status(
+                "😊 열심히 생각중 입니다...", expanded=True
+            ) as status:
+                st.write("🧑‍💻 질문의 의도를 분석하는 중입니다.")
+                last_node = None
+                answer = ""
+                # app.stream을 통해 입력된 메시지에 대한 출력을 스트리밍합니다.
+                for mode, output in app.stream(
+                    inputs, config=config, stream_mode=["updates", "messages", "debug"]
+                ):
+                    if mode == "messages":
+                        # 답변 노드에서 생성되는 토큰을 바로 화면에 출력합니다.
+                        chunk, metadata = output
+                        if answer_container is None:
+                            continue
+                        if metadata.get("langgraph_node") not in ANSWER_NODES:
+                            continue
+                        token = message_text(chunk)
+                        if token:
+                            answer += token
+                            answer_container.markdown(answer + "▌")
+                        continue
+
+                    if mode == "debug":
+                        # 답변이 검증을 통과하지 못해 다시 생성해야 하면, 재시도 노드가 끝날 때까지 기다리지 않고
+                        # 노드가 시작되는 즉시 보여주던 답변을 지웁니다.
+                        if is_retry_start(output) and answer:
+                            answer = ""
+                            answer_container.empty()
+                        continue
+
+                    # 출력된 결과에서 키와 값을 순회합니다.
+                    for key, value in output.items():
+                        last_node = key
+                        # 노드의 이름과 해당 노드에서 나온 출력을 출력합니다.
+                        if key in NODE_ACTIONS:
+                            st.write(NODE_ACTIONS[key])
+                    # 출력 값을 예쁘게 출력합니다.
+                if last_node == "budget_exhausted":
+                    status.update(label="답변 완료 (검증 미완료)", state="complete", expanded=False)
+                else:
+                    status.update(label="답변 완료", state="complete", expanded=False)
+        except GraphRecursionError as e:
+            print(f"Recursion limit reached: {e}")
+            return app.get_state(config={"configurable": {"thread_id": thread_id}}).values
+
+    snapshot = app.get_state(config={"configurable": {"thread_id": thread_id}})
+    # rag_answer 이후 그래프가 종료되었다는 것은 AnswerGroundednessCheckNode 가 "relevant" 로 판정했다는 의미
+    if cache is not None and last_node == "rag_answer" and not snapshot.next:
+        cache.store(query, snapshot.values["generation"])
+    return snapshot.values
+
+
+async def astream_graph(app, query: str, thread_id: str, cache=None, run_id=None):
+    """
+    stream_graph 의 비동기 버전. UI 에 의존하지 않고 진행 이벤트를 dict 로 yield 합니다.
+    그래프는 create_graph(async_mode=True) 로 생성되어야 합니다.
+
+    이벤트 종류:
+        {"type": "node", "node": 노드 이름, "message": 진행 메시지}
+        {"type": "token", "text": 답변 토큰}
+        {"type": "reset"}: 지금까지 스트리밍한 답변을 폐기
+        {"type": "done", "state": 최종 상태, "cached": 캐시 사용 여부}
+            state["budget_exhausted"] 가 있으면 예산이 소진되어 검증을 마치지 못한 답변
+    """
+    if cache is not None:
+        cached_generation = await asyncio.to_thread(cache.lookup, query)
+        if cached_generation is not None:
+            await _cache_hit_run(cached_generation).ainvoke(query, config=graph_config(thread_id, run_id))
+            yield {"type": "token", "text": cached_generation}
+            yield {
+                "type": "done",
+                "state": GraphState(
+                    question=query,
+                    generation=cached_generation,
+                    documents=[],
+                    rewrite_count=0,
+                ),
+                "cached": True,
+            }
+            return
+
+    config = graph_config(thread_id, run_id)
+    last_node = None
+    streamed = False
+    with metrics.request_trace(thread_id):
+        try:
+            async for mode, output in app.astream(
+                initial_state(query), config=config, stream_mode=["updates", "messages", "debug"]
+            ):
+                if mode == "messages":
+                    chunk, metadata = output
+                    if metadata.get("langgraph_node") not in ANSWER_NODES:
+                        continue
+                    token = message_text(chunk)
+                    if token:
+                        streamed = True
+                        yield {"type": "token", "text": token}
+                    continue
+
+                if mode == "debug":
+                    if is_retry_start(output) and streamed:
+                        streamed = False
+                        yield {"type": "reset"}
+                    continue
+
                 for key, value in output.items():
-                    # 노드의 이름과 해당 노드에서 나온 출력을 출력합니다.
-                    if key in actions:
-                        st.write(actions[key])
-                # 출력 값을 예쁘게 출력합니다.
-            status.update(label="답변 완료", state="complete", expanded=False)
-    except GraphRecursionError as e:
-        print(f"Recursion limit reached: {e}")
-    return app.get_state(config={"configurable": {"thread_id": thread_id}}).values
+                    last_node = key
+                    yield {"type": "node", "node": key, "message": NODE_ACTIONS.get(key)}
+        except GraphRecursionError as e:
+            print(f"Recursion limit reached: {e}")
+            last_node = None
 
+    snapshot = await app.aget_state(config={"configurable": {"thread_id": thread_id}})
+    if cache is not None and last_node == "rag_answer" and not snapshot.next:
+        await asyncio.to_thread(cache.store, query, snapshot.values["generation"])
+    yield {"type": "done", "state": snapshot.values, "cached": False}
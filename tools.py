@@ -1,7 +1,265 @@
-from langchain_teddynote.tools.tavily import TavilySearch
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from metrics import registry
+
+
+# 웹 검색 결과 캐시 설정 (환경 변수로 변경 가능)
+WEB_SEARCH_CACHE_ENABLED = os.environ.get("WEB_SEARCH_CACHE_ENABLED", "true").lower() != "false"
+WEB_SEARCH_CACHE_TTL = float(os.environ.get("WEB_SEARCH_CACHE_TTL", 6 * 3600))
+WEB_SEARCH_CACHE_MAX_SIZE = int(os.environ.get("WEB_SEARCH_CACHE_MAX_SIZE", 1024))
+# 비어 있으면 메모리에만 보관
+WEB_SEARCH_CACHE_PATH = os.environ.get("WEB_SEARCH_CACHE_PATH", "")
+
+_WHITESPACE = re.compile(r"\s+")
+
+# 테스트/벤치마크에서 TavilySearch 대신 사용할 도구 생성 함수
+_web_search_factory = None
+
+
+def set_web_search_factory(factory):
+    """create_web_search_tool 이 사용할 도구 생성 함수 교체 (None 이면 TavilySearch)"""
+    global _web_search_factory
+    _web_search_factory = factory
+
+
+def normalize_query(query):
+    # 대소문자, 공백, 끝의 문장 부호만 다른 질문은 같은 검색으로 취급
+    query = unicodedata.normalize("NFKC", query).lower()
+    return _WHITESPACE.sub(" ", query).strip().rstrip("?!.。 ")
+
+
+def clean_results(results):
+    """검색 결과의 content 공백을 정리하고, 내용이 없거나 url/content 가 중복된 결과를 제거"""
+    cleaned, seen_urls, seen_contents = [], set(), set()
+    for result in results:
+        content = _WHITESPACE.sub(" ", result.get("content") or "").strip()
+        if not content:
+            continue
+        digest = hashlib.sha1(content.lower().encode("utf-8")).hexdigest()
+        url = result.get("url")
+        if digest in seen_contents or (url and url in seen_urls):
+            continue
+        seen_contents.add(digest)
+        if url:
+            seen_urls.add(url)
+        cleaned.append({**result, "content": content})
+    return cleaned
+
+
+def _record_lookup(result):
+    registry.inc(
+        "web_search_cache_lookups_total",
+        help="Web search cache lookups (coalesced: waited for an in-flight search)",
+        result=result,
+    )
+
+
+class WebSearchCache:
+    """
+    정규화된 검색어 -> 검색 결과 캐시 (프로세스 전체에서 공유)
+
+    메모리에는 max_size 개까지 LRU 로 보관하고, path 가 있으면 SQLite 에도 저장해 재시작 후에도 사용합니다.
+    같은 검색어로 진행 중인 검색이 있으면 새로 검색하지 않고 그 결과를 기다립니다. (세션/이벤트 루프 무관)
+    """
+
+    def __init__(self, ttl=WEB_SEARCH_CACHE_TTL, max_size=WEB_SEARCH_CACHE_MAX_SIZE, path=WEB_SEARCH_CACHE_PATH):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS web_search_cache (key TEXT PRIMARY KEY, results TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT results, created FROM web_search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[1], json.loads(row[0]))
+                    self._entries[key] = entry
+            if entry is None or now - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                _record_lookup("miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        _record_lookup("hit")
+        return entry[1]
+
+    def put(self, key, results):
+        created = time.time()
+        with self._lock:
+            self._entries[key] = (created, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO web_search_cache (key, results, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(results, ensure_ascii=False), created),
+                )
+                self._conn.execute("DELETE FROM web_search_cache WHERE created < ?", (created - self.ttl,))
+                self._conn.commit()
+
+    def join(self, key):
+        """(future, leader). leader 가 True 이면 호출자가 검색을 실행하고 finish() 를 호출해야 함"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                _record_lookup("coalesced")
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def finish(self, key, future, results=None, error=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+            return
+        self.put(key, results)
+        future.set_result(results)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM web_search_cache")
+                self._conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class CachedWebSearch:
+    """
+    웹 검색 도구 래퍼. TavilySearch 와 같은 invoke/ainvoke({"query": ...}) 인터페이스를 제공하며
+    결과는 clean_results() 로 정리되어 반환됩니다.
+    """
+
+    def __init__(self, tool, cache=None):
+        self.tool = tool
+        self.cache = cache
+
+    @staticmethod
+    def _query(input):
+        return input["query"] if isinstance(input, dict) else input
+
+    def invoke(self, input, config=None):
+        query = self._query(input)
+        if self.cache is None:
+            return clean_results(self.tool.invoke({"query": query}, config))
+
+        key = normalize_query(query)
+        results = self.cache.get(key)
+        if results is not None:
+            return results
+        future, leader = self.cache.join(key)
+        if not leader:
+            return future.result()
+        try:
+            results = clean_results(self.tool.invoke({"query": query}, config))
+        except Exception as e:
+            self.cache.finish(key, future, error=e)
+            raise
+        self.cache.finish(key, future, results)
+        return results
+
+    async def ainvoke(self, input, config=None):
+        query = self._query(input)
+        if self.cache is None:
+            return clean_results(await self.tool.ainvoke({"query": query}, config))
+
+        key = normalize_query(query)
+        results = self.cache.get(key)
+        if results is not None:
+            return results
+        future, leader = self.cache.join(key)
+        if not leader:
+            # 다른 스레드(이벤트 루프)에서 진행 중인 검색도 기다릴 수 있도록 concurrent Future 사용
+            return await asyncio.wrap_future(future)
+        try:
+            results = clean_results(await self.tool.ainvoke({"query": query}, config))
+        except BaseException as e:
+            # 취소된 경우 기다리던 다른 요청에는 일반 오류로 전달
+            error = RuntimeError("web search cancelled") if isinstance(e, asyncio.CancelledError) else e
+            self.cache.finish(key, future, error=error)
+            raise
+        self.cache.finish(key, future, results)
+        return results
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_cache_enabled = WEB_SEARCH_CACHE_ENABLED
+
+
+def configure_web_search_cache(enabled=None):
+    """웹 검색 캐시 사용 여부 설정. 도구 생성 전에 호출해야 적용됩니다."""
+    global _cache_enabled
+    if enabled is not None:
+        _cache_enabled = enabled
+
+
+def get_web_search_cache():
+    """프로세스 전체에서 공유하는 WebSearchCache. 비활성화된 경우 None"""
+    global _cache
+    if not _cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = WebSearchCache()
+        return _cache
+
+
+def web_search_cache_stats():
+    """공유 웹 검색 캐시의 hit/miss 통계 (캐시가 비활성화되었거나 아직 생성되지 않았으면 None)"""
+    return _cache.stats() if _cache_enabled and _cache is not None else None
 
 
 def create_web_search_tool():
-    # 웹 검색 도구 생성
-    web_search_tool = TavilySearch(max_results=6)
-    return web_search_tool
+    if _web_search_factory is not None:
+        tool = _web_search_factory()
+    else:
+        from langchain_teddynote.tools.tavily import TavilySearch
+
+        # 웹 검색 도구 생성
+        tool = TavilySearch(max_results=6)
+    return CachedWebSearch(tool, cache=get_web_search_cache())
@@ -0,0 +1,294 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.tracers.base import BaseTracer
+
+import metrics
+
+
+# "full": langsmith 기본 추적(모든 실행을 그대로 전송), "sampled": SampledTracer, "off": 추적하지 않음
+TRACING_MODE = os.environ.get("TRACING_MODE", "full")
+TRACING_SAMPLE_RATE = float(os.environ.get("TRACING_SAMPLE_RATE", 0.1))
+
+# payload 를 줄일 때 사용하는 기본값
+MAX_LIST_ITEMS = 5
+MAX_STRING_CHARS = 2000
+TRUNCATED_KEYS = ("documents", "context", "document_scores")
+
+
+def truncate_payload(value, max_items=MAX_LIST_ITEMS, max_chars=MAX_STRING_CHARS, _key=None):
+    """큰 inputs/outputs 를 줄임. documents 등의 목록은 앞쪽 max_items 개만, 문자열은 max_chars 자까지 남김"""
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return value[:max_chars] + f"… [{len(value) - max_chars} chars truncated]"
+    if isinstance(value, dict):
+        return {k: truncate_payload(v, max_items, max_chars, _key=k) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = list(value)
+        if _key in TRUNCATED_KEYS and len(items) > max_items:
+            kept = [truncate_payload(v, max_items, max_chars) for v in items[:max_items]]
+            return kept + [f"… [{len(items) - max_items} more items]"]
+        return [truncate_payload(v, max_items, max_chars) for v in items]
+    if hasattr(value, "page_content"):
+        return {"page_content": truncate_payload(value.page_content, max_items, max_chars), "metadata": value.metadata}
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    return truncate_payload(str(value), max_items, max_chars)
+
+
+def _walk(run):
+    yield run
+    for child in run.child_runs:
+        yield from _walk(child)
+
+
+def run_to_dict(run, project_name, truncate=True):
+    inputs, outputs = run.inputs, run.outputs
+    if truncate:
+        inputs, outputs = truncate_payload(inputs), truncate_payload(outputs)
+    return {
+        "id": str(run.id),
+        "trace_id": str(run.trace_id),
+        "dotted_order": run.dotted_order,
+        "parent_run_id": str(run.parent_run_id) if run.parent_run_id else None,
+        "name": run.name,
+        "run_type": run.run_type,
+        "start_time": run.start_time.isoformat(),
+        "end_time": run.end_time.isoformat() if run.end_time else None,
+        "inputs": inputs,
+        "outputs": outputs,
+        "error": run.error,
+        "extra": run.extra,
+        "tags": run.tags,
+        "session_name": project_name,
+    }
+
+
+class LocalCollector:
+    """batch_ingest_runs 만 구현한 LangSmith Client 대용 (테스트/벤치마크용). path 가 있으면 JSONL 로도 기록"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.runs = []
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def batch_ingest_runs(self, create=None, update=None):
+        runs = list(create or []) + list(update or [])
+        with self._lock:
+            self.runs.extend(runs)
+            self.batches += 1
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    for run in runs:
+                        file.write(json.dumps(run, ensure_ascii=False, default=str) + "\n")
+
+
+class BatchExporter:
+    """
+    trace 를 백그라운드 스레드에서 run dict 로 변환하고 batch_size 개씩 모아 client.batch_ingest_runs 로 전송
+
+    요청 경로에서는 변환 함수를 대기열에 넣기만 하며, 대기열이 가득 차면 기다리지 않고 버립니다.
+    """
+
+    def __init__(self, client, batch_size=100, flush_interval=1.0, max_queue=1000, max_attempts=3):
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.exported = 0
+        self.dropped = 0
+        threading.Thread(target=self._run, name="trace-export", daemon=True).start()
+
+    def submit(self, convert):
+        """convert: 호출하면 전송할 run dict 목록을 반환하는 함수"""
+        try:
+            self._queue.put_nowait(convert)
+        except queue.Full:
+            self.dropped += 1
+            if metrics.METRICS_ENABLED:
+                metrics.registry.inc("traces_dropped_total", help="Traces dropped because the export queue was full")
+
+    def _run(self):
+        while True:
+            traces = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            batch = []
+            try:
+                batch.extend(traces[0]())
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        traces.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                    batch.extend(traces[-1]())
+                self._export(batch)
+            except Exception as e:
+                print(f"Trace export failed: {e!r}")
+            finally:
+                for _ in traces:
+                    self._queue.task_done()
+
+    def _export(self, batch):
+        for attempt in range(self.max_attempts):
+            try:
+                self.client.batch_ingest_runs(create=batch)
+                self.exported += len(batch)
+                if metrics.METRICS_ENABLED:
+                    metrics.registry.inc("trace_runs_exported_total", len(batch), help="Trace runs exported")
+                return
+            except Exception as e:
+                error = e
+                time.sleep(0.5 * 2**attempt)
+        print(f"Trace export failed, dropping {len(batch)} runs: {error!r}")
+
+    def drain(self):
+        """대기열의 trace 가 모두 전송될 때까지 대기 (테스트/벤치마크용)"""
+        self._queue.join()
+
+
+class SampledTracer(BaseTracer):
+    """
+    trace(최상위 실행) 단위로 샘플링하는 tracer
+
+    실행 중에는 메모리에만 기록하고, 최상위 실행이 끝나면
+    - 오류가 있거나 sample_rate 에 뽑힌 trace 는 payload 를 줄여 BatchExporter 로 전송
+    - 나머지는 최근 max_deferred 개를 보관해 두었다가 promote(run_id) 되면 전송 (피드백을 받은 경우)
+    """
+
+    run_inline = True
+
+    def __init__(
+        self,
+        exporter,
+        project_name,
+        sample_rate=TRACING_SAMPLE_RATE,
+        truncate=True,
+        max_deferred=256,
+        deferred_ttl=900,
+        max_exported=4096,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.exporter = exporter
+        self.project_name = project_name
+        self.sample_rate = sample_rate
+        self.truncate = truncate
+        self.max_deferred = max_deferred
+        self.deferred_ttl = deferred_ttl
+        self.max_exported = max_exported
+        self._deferred = OrderedDict()
+        # 최근 전송한 trace 의 최상위 run id (피드백을 보낼 수 있는지 확인용)
+        self._exported = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _persist_run(self, run):
+        has_error = any(r.error for r in _walk(run))
+        if has_error or random.random() < self.sample_rate:
+            self._export(run, "error" if has_error else "sampled")
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._deferred[str(run.id)] = (now, run)
+            while self._deferred and (
+                len(self._deferred) > self.max_deferred
+                or now - next(iter(self._deferred.values()))[0] > self.deferred_ttl
+            ):
+                self._deferred.popitem(last=False)
+        if metrics.METRICS_ENABLED:
+            metrics.registry.inc("traces_total", help="Traces seen by the sampled tracer", decision="deferred")
+
+    def promote(self, run_id):
+        """
+        보관 중인 trace 를 전송. 이미 전송했거나 지금 전송하면 True,
+        전송하지 않은 채 보관 기간이 지났으면(LangSmith 에 없는 run) False
+        """
+        with self._lock:
+            if str(run_id) in self._exported:
+                return True
+            entry = self._deferred.pop(str(run_id), None)
+        if entry is None:
+            return False
+        self._export(entry[1], "promoted")
+        return True
+
+    def _export(self, run, decision):
+        with self._lock:
+            self._exported[str(run.id)] = True
+            while len(self._exported) > self.max_exported:
+                self._exported.popitem(last=False)
+        # payload 변환(직렬화)도 요청 경로가 아닌 export 스레드에서 실행
+        self.exporter.submit(lambda: [run_to_dict(r, self.project_name, self.truncate) for r in _walk(run)])
+        if metrics.METRICS_ENABLED:
+            metrics.registry.inc("traces_total", help="Traces seen by the sampled tracer", decision=decision)
+
+
+_tracer = None
+_configured = False
+
+
+def configure_tracing(mode=TRACING_MODE, project_name=None, client=None, sample_rate=TRACING_SAMPLE_RATE, truncate=True):
+    """
+    추적 방식 설정
+
+    Args:
+        mode: "full"(langsmith 기본 추적), "sampled"(SampledTracer), "off"
+        client: batch_ingest_runs 를 가진 객체 (없으면 langsmith.Client, 테스트에서는 LocalCollector)
+    """
+    global _tracer, _configured
+    _tracer = None
+    _configured = True
+    if mode == "full":
+        # langchain_teddynote.logging.langsmith() 와 같은 설정 (무거운 패키지를 import 하지 않도록 직접 설정)
+        os.environ["LANGCHAIN_TRACING_V2"] = "true"
+        if project_name:
+            os.environ["LANGCHAIN_PROJECT"] = project_name
+        return None
+
+    # 환경 변수(.env)로 켜진 langsmith 기본 추적은 끔
+    for name in ("LANGCHAIN_TRACING_V2", "LANGSMITH_TRACING"):
+        os.environ[name] = "false"
+    if mode == "off":
+        return None
+    if mode != "sampled":
+        raise ValueError(f"Unknown tracing mode: {mode}")
+
+    if client is None:
+        from langsmith import Client
+
+        client = Client()
+    _tracer = SampledTracer(BatchExporter(client), project_name, sample_rate=sample_rate, truncate=truncate)
+    return _tracer
+
+
+def ensure_tracing(mode=TRACING_MODE, project_name=None):
+    """프로세스에서 처음 호출될 때만 configure_tracing (Streamlit 은 상호작용마다 스크립트를 다시 실행)"""
+    if not _configured:
+        configure_tracing(mode, project_name)
+    return _tracer
+
+
+def callbacks():
+    """그래프 실행 config 에 추가할 callback 목록 (sampled 모드가 아니면 빈 목록)"""
+    return [_tracer] if _tracer is not None else []
+
+
+def record_feedback(run_id):
+    """
+    피드백을 받은 실행의 trace 를 전송하고, LangSmith 에 피드백을 보낼 수 있는지 반환
+    추적이 꺼져 있거나(off), sampled 모드에서 보관 기간이 지나 전송하지 못한 실행이면 False
+    """
+    if _tracer is not None:
+        return _tracer.promote(run_id)
+    # full 모드(또는 .env 로 켠 langsmith 기본 추적)에서만 실행이 LangSmith 에 기록됨
+    return any(os.environ.get(name, "").lower() == "true" for name in ("LANGCHAIN_TRACING_V2", "LANGSMITH_TRACING"))
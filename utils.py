@@ -16,13 +16,19 @@ def get_cells(ipynb_filepath):
     return cells
 
 
-def write_to_md(filename, output_cells):
-    body = ""
-    for cell in output_cells:
+def render_cells(cells):
+    # 문자열을 반복해서 이어붙이지 않고 조각을 모아 한 번에 합침
+    parts = []
+    for cell in cells:
         if cell["type"] == "code":
-            body += f"\n```python\n{cell['content']}\n```\n"
+            parts.append(f"\n```python\n{cell['content']}\n```\n")
         elif cell["type"] == "markdown":
-            body += f"\n{cell['content']}\n"
+            parts.append(f"\n{cell['content']}\n")
+    return "".join(parts)
+
+
+def write_to_md(filename, output_cells):
+    body = render_cells(output_cells)
 
     # 파일로 저장
     with open(filename, "w", encoding="utf-8") as file: